@@ -0,0 +1,309 @@
+#!/usr/bin/env python3
+"""
+Word-level timings and caption cue building for the caption scripts.
+
+Whisper segments are often 10-30 second blocks that players render poorly.
+When transcribe_to_vtt.py runs with --word-timestamps it keeps every word
+with its start/end time in a compact WordTimings table (parallel millisecond
+arrays) and saves it as words_<lang>.json. build_cues() re-segments that
+table in a single pass, and the same stored timings can be rendered as VTT,
+SRT or a JSON transcript without re-running inference:
+
+    python3 caption_formats.py words_en.json --format srt --output captions_en.srt
+"""
+
+import argparse
+import json
+import sys
+import time
+from array import array
+from collections import namedtuple
+
+WORDS_FORMAT = "words-v1"
+
+# Readability defaults (in line with common broadcast/streaming caption guidelines)
+DEFAULT_MAX_CHARS_PER_LINE = 42
+DEFAULT_MAX_LINES = 2
+DEFAULT_MAX_CUE_DURATION = 7.0
+DEFAULT_MIN_GAP = 0.08
+# A pause at least this long always starts a new cue
+DEFAULT_PAUSE_SPLIT = 1.0
+
+SENTENCE_END = (".", "?", "!", "।", "॥")
+
+Cue = namedtuple("Cue", ["start_ms", "end_ms", "lines", "language"])
+Cue.__new__.__defaults__ = (None,)
+
+
+class WordTimings:
+    """Words with start/end times in milliseconds, stored as parallel arrays.
+
+    Code-mixed transcripts also keep language_runs: [word_index, language]
+    pairs marking where the spoken language changes.
+    """
+
+    def __init__(self, words=None, start_ms=None, end_ms=None, language=None, language_runs=None):
+        self.words = list(words or [])
+        self.start_ms = array("q", start_ms or [])
+        self.end_ms = array("q", end_ms or [])
+        self.language = language
+        self.language_runs = [list(run) for run in language_runs or []]
+        if not (len(self.words) == len(self.start_ms) == len(self.end_ms)):
+            raise ValueError("words, start_ms and end_ms must have the same length")
+
+    def __len__(self):
+        return len(self.words)
+
+    def append(self, word, start, end, language=None):
+        """Add one word; start/end are in seconds"""
+        word = word.strip()
+        if not word:
+            return
+        if language and (not self.language_runs or self.language_runs[-1][1] != language):
+            self.language_runs.append([len(self.words), language])
+        start_ms = int(round(float(start) * 1000.0))
+        self.words.append(word)
+        self.start_ms.append(start_ms)
+        self.end_ms.append(max(start_ms, int(round(float(end) * 1000.0))))
+
+    @classmethod
+    def from_segments(cls, segments, language=None):
+        """Collect word timings from Whisper segments.
+
+        Segments transcribed without word_timestamps have no .words; their
+        text is spread over the segment duration in proportion to word length.
+        """
+        timings = cls(language=language)
+        for seg in segments:
+            seg_language = getattr(seg, "language", None)
+            words = getattr(seg, "words", None)
+            if words:
+                for w in words:
+                    timings.append(
+                        getattr(w, "word", ""), getattr(w, "start", 0.0), getattr(w, "end", 0.0), seg_language
+                    )
+                continue
+            tokens = getattr(seg, "text", "").split()
+            if not tokens:
+                continue
+            start = float(getattr(seg, "start", 0.0))
+            duration = max(0.0, float(getattr(seg, "end", start)) - start)
+            total_chars = sum(len(t) for t in tokens)
+            offset = 0
+            for token in tokens:
+                word_start = start + duration * offset / total_chars
+                offset += len(token)
+                timings.append(token, word_start, start + duration * offset / total_chars, seg_language)
+        return timings
+
+    def to_dict(self):
+        data = {
+            "format": WORDS_FORMAT,
+            "language": self.language,
+            "words": self.words,
+            "start_ms": self.start_ms.tolist(),
+            "end_ms": self.end_ms.tolist(),
+        }
+        if self.language_runs:
+            data["language_runs"] = self.language_runs
+        return data
+
+    @classmethod
+    def from_dict(cls, data):
+        if data.get("format") != WORDS_FORMAT:
+            raise ValueError(f"Unsupported word timings format: {data.get('format')}")
+        return cls(data["words"], data["start_ms"], data["end_ms"], language=data.get("language"),
+                   language_runs=data.get("language_runs"))
+
+    def save(self, path):
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(self.to_dict(), f, ensure_ascii=False, separators=(",", ":"))
+
+    @classmethod
+    def load(cls, path):
+        with open(path, encoding="utf-8") as f:
+            return cls.from_dict(json.load(f))
+
+
+def build_cues(timings, max_chars_per_line=DEFAULT_MAX_CHARS_PER_LINE, max_lines=DEFAULT_MAX_LINES,
+               max_duration=DEFAULT_MAX_CUE_DURATION, min_gap=DEFAULT_MIN_GAP,
+               pause_split=DEFAULT_PAUSE_SPLIT):
+    """Group words into cues in one pass over the timings.
+
+    A word goes on the current line if it fits in max_chars_per_line, else on
+    a new line. A new cue starts before a word when:
+
+    - the cue would run longer than max_duration seconds,
+    - the speaker paused for at least pause_split seconds,
+    - the spoken language changes (each cue is tagged with its language),
+    - the current line ends a sentence and the cue already has a finished
+      line or the current line is at least half of max_chars_per_line, or
+    - the word does not fit on the current line and max_lines are in use.
+
+    Consecutive cues are kept at least min_gap seconds apart by trimming the
+    earlier cue's end.
+    """
+    words = timings.words
+    starts = timings.start_ms
+    ends = timings.end_ms
+    max_duration_ms = int(max_duration * 1000)
+    min_gap_ms = int(min_gap * 1000)
+    pause_ms = int(pause_split * 1000)
+    runs = timings.language_runs
+    run_pos = 0
+    word_language = None
+
+    cues = []
+    lines = []
+    line = []
+    line_len = 0
+    cue_start = cue_end = 0
+    cue_language = None
+
+    def close_cue():
+        if line:
+            lines.append(" ".join(line))
+        if cues and cue_start - cues[-1].end_ms < min_gap_ms:
+            prev = cues[-1]
+            cues[-1] = Cue(prev.start_ms, max(prev.start_ms, cue_start - min_gap_ms), prev.lines, prev.language)
+        cues.append(Cue(cue_start, cue_end, lines, cue_language))
+
+    for i in range(len(words)):
+        word = words[i]
+        start = starts[i]
+        end = ends[i]
+        if run_pos < len(runs) and runs[run_pos][0] == i:
+            word_language = runs[run_pos][1]
+            run_pos += 1
+        if not line and not lines:
+            cue_start, cue_end = start, end
+            cue_language = word_language
+            line = [word]
+            line_len = len(word)
+            continue
+
+        new_len = line_len + 1 + len(word)
+        sentence_break = line and line[-1].endswith(SENTENCE_END) and (lines or line_len >= max_chars_per_line // 2)
+        if (end - cue_start > max_duration_ms
+                or start - cue_end >= pause_ms
+                or word_language != cue_language
+                or sentence_break
+                or (new_len > max_chars_per_line and len(lines) + 1 >= max_lines)):
+            close_cue()
+            lines = []
+            cue_start, cue_end = start, end
+            cue_language = word_language
+            line = [word]
+            line_len = len(word)
+            continue
+
+        if new_len > max_chars_per_line:
+            lines.append(" ".join(line))
+            line = [word]
+            line_len = len(word)
+        else:
+            line.append(word)
+            line_len = new_len
+        cue_end = end
+
+    if line or lines:
+        close_cue()
+    return cues
+
+
+def format_timestamp(ms, separator="."):
+    h, rem = divmod(max(0, int(ms)), 3600_000)
+    m, rem = divmod(rem, 60_000)
+    s, ms = divmod(rem, 1000)
+    return f"{h:02d}:{m:02d}:{s:02d}{separator}{ms:03d}"
+
+
+def render_vtt(cues):
+    parts = ["WEBVTT\n\n"]
+    for cue in cues:
+        parts.append(f"{format_timestamp(cue.start_ms)} --> {format_timestamp(cue.end_ms)}\n")
+        if cue.language:
+            parts.append(f"<lang {cue.language}>" + "\n".join(cue.lines) + "</lang>")
+        else:
+            parts.append("\n".join(cue.lines))
+        parts.append("\n\n")
+    return "".join(parts)
+
+
+def render_srt(cues):
+    parts = []
+    for i, cue in enumerate(cues, 1):
+        parts.append(f"{i}\n{format_timestamp(cue.start_ms, ',')} --> {format_timestamp(cue.end_ms, ',')}\n")
+        parts.append("\n".join(cue.lines))
+        parts.append("\n\n")
+    return "".join(parts)
+
+
+def render_json(cues, language=None):
+    return json.dumps({
+        "language": language,
+        "cues": [
+            {"start": cue.start_ms / 1000.0, "end": cue.end_ms / 1000.0, "text": "\n".join(cue.lines),
+             "language": cue.language or language}
+            for cue in cues
+        ],
+    }, ensure_ascii=False)
+
+
+RENDERERS = {
+    "vtt": lambda cues, language: render_vtt(cues),
+    "srt": lambda cues, language: render_srt(cues),
+    "json": render_json,
+}
+
+
+def write_captions(cues, out_path, fmt="vtt", language=None):
+    with open(out_path, "w", encoding="utf-8") as f:
+        f.write(RENDERERS[fmt](cues, language))
+
+
+def add_cue_arguments(parser):
+    """Add the shared cue layout options to an argparse parser"""
+    group = parser.add_argument_group("cue layout")
+    group.add_argument("--max-chars-per-line", type=int, default=DEFAULT_MAX_CHARS_PER_LINE)
+    group.add_argument("--max-lines", type=int, default=DEFAULT_MAX_LINES)
+    group.add_argument("--max-cue-duration", type=float, default=DEFAULT_MAX_CUE_DURATION, help="Seconds")
+    group.add_argument("--min-cue-gap", type=float, default=DEFAULT_MIN_GAP, help="Seconds between cues")
+    group.add_argument("--pause-split", type=float, default=DEFAULT_PAUSE_SPLIT,
+                       help="A pause of at least this many seconds starts a new cue")
+    return group
+
+
+def cue_options(args):
+    return {
+        "max_chars_per_line": args.max_chars_per_line,
+        "max_lines": args.max_lines,
+        "max_duration": args.max_cue_duration,
+        "min_gap": args.min_cue_gap,
+        "pause_split": args.pause_split,
+    }
+
+
+def main():
+    p = argparse.ArgumentParser(description="Render stored word timings as VTT, SRT or JSON captions")
+    p.add_argument("words", help="words_<lang>.json written by transcribe_to_vtt.py --word-timestamps")
+    p.add_argument("--format", choices=sorted(RENDERERS), default="vtt")
+    p.add_argument("--output", help="Output file (default: stdout)")
+    add_cue_arguments(p)
+    args = p.parse_args()
+
+    timings = WordTimings.load(args.words)
+    start_time = time.time()
+    cues = build_cues(timings, **cue_options(args))
+    output = RENDERERS[args.format](cues, timings.language)
+    elapsed = time.time() - start_time
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write(output)
+    else:
+        sys.stdout.write(output)
+    print(f"Built {len(cues)} cues from {len(timings)} words in {elapsed * 1000:.1f}ms", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,226 @@
+#!/usr/bin/env python3
+"""
+Per-chunk language detection for code-mixed lectures (--lang auto).
+
+The audio is split into VAD speech chunks and each chunk's language is
+detected from its first encoder window only (at most 30 seconds of audio),
+which is much cheaper than detecting over the full recording. Chunks are
+then grouped by language and every group is transcribed in one pass with the
+right language token; the resulting segments are mapped back to the original
+timeline, split wherever they cross from one chunk into the next (so they
+never cover the other-language speech in between) and tagged with their
+language.
+
+numpy and faster-whisper are imported where they are used so the chunk and
+timeline helpers can be used without them.
+"""
+
+import time
+from bisect import bisect_left, bisect_right
+from collections import OrderedDict, namedtuple
+
+SAMPLING_RATE = 16000
+DEFAULT_ALLOWED_LANGUAGES = ("en", "hi", "pa")
+# Chunks shorter than this inherit the previous chunk's language
+MIN_DETECT_SECONDS = 1.0
+
+TaggedWord = namedtuple("TaggedWord", ["word", "start", "end"])
+
+
+class SpeechChunk:
+    """One VAD speech chunk (sample offsets) and its detected language"""
+
+    def __init__(self, start, end):
+        self.start = start
+        self.end = end
+        self.language = None
+        self.probability = 0.0
+
+    @property
+    def duration(self):
+        return (self.end - self.start) / SAMPLING_RATE
+
+
+class TaggedSegment:
+    """Transcribed segment on the original timeline, tagged with its language"""
+
+    def __init__(self, start, end, text, language, words=None):
+        self.start = start
+        self.end = end
+        self.text = text
+        self.language = language
+        self.words = words
+
+
+class CodeMixedInfo:
+    """Transcription info for --lang auto, including detection timing"""
+
+    def __init__(self, duration, chunks, decode_seconds, vad_seconds, detection_seconds):
+        self.duration = duration
+        self.chunks = chunks
+        self.decode_seconds = decode_seconds
+        self.vad_seconds = vad_seconds
+        self.detection_seconds = detection_seconds
+        self.language_seconds = {}
+        for chunk in chunks:
+            self.language_seconds[chunk.language] = self.language_seconds.get(chunk.language, 0.0) + chunk.duration
+        self.language = max(self.language_seconds, key=self.language_seconds.get) if chunks else None
+
+
+class ChunkTimeline:
+    """Maps times in a group's concatenated audio back to the original recording"""
+
+    def __init__(self, chunks):
+        self.concat_starts = []
+        self.original_starts = []
+        self.lengths = []
+        offset = 0
+        for chunk in chunks:
+            self.concat_starts.append(offset)
+            self.original_starts.append(chunk.start)
+            self.lengths.append(chunk.end - chunk.start)
+            offset += chunk.end - chunk.start
+
+    def chunk_index(self, t, is_end=False):
+        """Index of the chunk that concatenated time t falls in"""
+        # An end time on a chunk boundary belongs to the chunk before it
+        find = bisect_left if is_end else bisect_right
+        return max(0, find(self.concat_starts, float(t) * SAMPLING_RATE) - 1)
+
+    def to_original(self, t, is_end=False, chunk=None):
+        """Map concatenated time t to the original timeline, inside chunk if given"""
+        i = self.chunk_index(t, is_end) if chunk is None else chunk
+        within = min(max(0.0, float(t) * SAMPLING_RATE - self.concat_starts[i]), self.lengths[i])
+        return (self.original_starts[i] + within) / SAMPLING_RATE
+
+
+def detect_language(model, window, allowed_languages=None):
+    """Return (language, probability) for one audio window using a single encoder pass"""
+    features = model.feature_extractor(window)[:, : model.feature_extractor.nb_max_frames]
+    encoder_output = model.encode(features)
+    results = model.model.detect_language(encoder_output)[0]
+    probabilities = [(token[2:-2], prob) for token, prob in results]
+    if allowed_languages:
+        allowed = [(lang, prob) for lang, prob in probabilities if lang in allowed_languages]
+        probabilities = allowed or probabilities
+    return max(probabilities, key=lambda item: item[1])
+
+
+def detect_chunk_languages(model, audio, chunks, allowed_languages=None, min_detect_seconds=MIN_DETECT_SECONDS,
+                           should_stop=None):
+    """Tag each chunk with the language of its first encoder window.
+
+    should_stop, if given, is called before each chunk and may raise to abort.
+    """
+    window_samples = model.feature_extractor.n_samples
+    previous = None
+    for chunk in chunks:
+        if should_stop is not None:
+            should_stop()
+        if previous is not None and chunk.duration < min_detect_seconds:
+            chunk.language, chunk.probability = previous.language, previous.probability
+            continue
+        window = audio[chunk.start : min(chunk.end, chunk.start + window_samples)]
+        chunk.language, chunk.probability = detect_language(model, window, allowed_languages)
+        previous = chunk
+    return chunks
+
+
+def group_chunks_by_language(chunks):
+    """Group chunks by language, keeping time order inside each group"""
+    groups = OrderedDict()
+    for chunk in chunks:
+        groups.setdefault(chunk.language, []).append(chunk)
+    return groups
+
+
+def split_segment_at_chunks(timeline, segment, language, keep_words=True):
+    """Map a segment of a group's audio back to the original timeline.
+
+    Whisper can run a segment across the join between two chunks of the same
+    language; mapped back as one segment it would cover whatever speech lies
+    between those chunks. Such segments are split where their words move to
+    the next chunk. Returns a list of TaggedSegment.
+    """
+    pieces = []  # [chunk index, [TaggedWord, ...]]
+    for w in getattr(segment, "words", None) or []:
+        i = timeline.chunk_index(w.start)
+        start = timeline.to_original(w.start, chunk=i)
+        word = TaggedWord(w.word, start, max(start, timeline.to_original(w.end, is_end=True, chunk=i)))
+        if pieces and pieces[-1][0] == i:
+            pieces[-1][1].append(word)
+        else:
+            pieces.append([i, [word]])
+
+    if len(pieces) <= 1:
+        # Entirely inside one chunk: keep Whisper's own segment bounds
+        i = pieces[0][0] if pieces else timeline.chunk_index(segment.start)
+        start = timeline.to_original(segment.start, chunk=i)
+        end = max(start, timeline.to_original(segment.end, is_end=True, chunk=i))
+        words = pieces[0][1] if pieces and keep_words else None
+        return [TaggedSegment(start, end, segment.text, language, words)]
+    return [
+        TaggedSegment(words[0].start, words[-1].end, "".join(w.word for w in words), language,
+                      words if keep_words else None)
+        for _, words in pieces
+    ]
+
+
+def transcribe_code_mixed(model, input_source, allowed_languages=DEFAULT_ALLOWED_LANGUAGES,
+                          max_chunk_seconds=30.0, word_timestamps=False, should_stop=None, **transcribe_options):
+    """Detect language per VAD chunk, then transcribe each language group in one pass.
+
+    Returns (segments_iter, info) like WhisperModel.transcribe(). Detection
+    runs eagerly so info.detection_seconds is known up front; segments are
+    yielded group by group, so they are not in time order. Word timestamps are
+    always computed so segments can be split at chunk boundaries; they are only
+    kept on the segments when word_timestamps is set. should_stop (e.g.
+    JobControl.check) is called after decoding and VAD, between detected
+    chunks and between language groups, and may raise to abort the job.
+    """
+    import numpy as np
+    from faster_whisper.audio import decode_audio
+    from faster_whisper.vad import VadOptions, get_speech_timestamps
+
+    if not model.model.is_multilingual:
+        raise ValueError("Per-chunk language detection needs a multilingual model (not *.en)")
+
+    def check():
+        if should_stop is not None:
+            should_stop()
+
+    start_time = time.time()
+    audio = decode_audio(input_source, sampling_rate=SAMPLING_RATE)
+    decode_seconds = time.time() - start_time
+    check()
+
+    start_time = time.time()
+    speech = get_speech_timestamps(audio, VadOptions(max_speech_duration_s=max_chunk_seconds))
+    chunks = [SpeechChunk(ts["start"], ts["end"]) for ts in speech]
+    vad_seconds = time.time() - start_time
+    check()
+
+    start_time = time.time()
+    detect_chunk_languages(model, audio, chunks, allowed_languages, should_stop=should_stop)
+    detection_seconds = time.time() - start_time
+
+    info = CodeMixedInfo(len(audio) / SAMPLING_RATE, chunks, decode_seconds, vad_seconds, detection_seconds)
+    groups = group_chunks_by_language(chunks)
+
+    def generate():
+        for language, group in groups.items():
+            check()
+            timeline = ChunkTimeline(group)
+            group_audio = np.concatenate([audio[c.start : c.end] for c in group])
+            segments_iter, _ = model.transcribe(
+                group_audio,
+                language=language,
+                vad_filter=False,  # Already split on speech
+                word_timestamps=True,  # Needed to split segments at chunk boundaries
+                **transcribe_options
+            )
+            for seg in segments_iter:
+                yield from split_segment_at_chunks(timeline, seg, language, keep_words=word_timestamps)
+            del group_audio
+
+    return generate(), info
@@ -0,0 +1,386 @@
+#!/usr/bin/env python3
+"""
+Storage backends for the caption scripts.
+
+Every script talks to object storage through StorageBackend so the pipeline
+can run against GCS in production or against a local directory for offline
+benchmarking and load tests. The local backend can simulate per-request
+latency and limited bandwidth. Local media inputs are read with
+open_reader(), which fetches the object through ranged reads, so the
+simulated limits also apply to the main media transfer; GCS inputs are
+still decoded straight from their public URL.
+
+    GCSStorage     google-cloud-storage bucket
+    LocalStorage   <root>/<bucket>/<object name> on disk
+
+Use add_storage_arguments() / open_storage() to select a backend from the
+command line (--storage gcs|local) or the CAPTION_STORAGE* environment.
+"""
+
+import io
+import json
+import os
+import shutil
+import time
+from abc import ABC, abstractmethod
+from collections import namedtuple
+from urllib.parse import quote, unquote, urlparse
+
+# Credentials file next to the Backend folder (same place the Node backend keeps it)
+DEFAULT_CREDENTIALS_PATH = os.path.join(
+    os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "gcp-credentials.json"
+)
+
+ObjectInfo = namedtuple("ObjectInfo", ["name", "size", "content_type", "metadata"])
+ObjectInfo.__new__.__defaults__ = (0, None, None)
+
+ListPage = namedtuple("ListPage", ["objects", "prefixes"])
+
+# Block size for ranged reads behind open_reader()
+DEFAULT_READ_BLOCK_SIZE = 8 * 1024 * 1024
+
+
+class StorageBackend(ABC):
+    """Minimal object-storage interface used by the caption scripts"""
+
+    bucket_name = None
+
+    @abstractmethod
+    def iter_pages(self, prefix="", delimiter=None, page_size=1000):
+        """Yield ListPage(objects, prefixes) in lexicographic name order"""
+
+    def list_objects(self, prefix="", page_size=1000):
+        """Yield ObjectInfo for every object under prefix"""
+        for page in self.iter_pages(prefix, page_size=page_size):
+            for obj in page.objects:
+                yield obj
+
+    @abstractmethod
+    def stat(self, name):
+        """Return ObjectInfo for name, or None if it does not exist"""
+
+    @abstractmethod
+    def read_range(self, name, start=0, end=None):
+        """Return bytes [start, end) of an object (end=None reads to the end)"""
+
+    @abstractmethod
+    def upload(self, local_path, name, content_type=None, metadata=None, public=False):
+        """Upload local_path as name and return its public URL"""
+
+    @abstractmethod
+    def public_url(self, name):
+        """Return the public URL (or local path) players and decoders can open"""
+
+    @abstractmethod
+    def object_name_from_url(self, url):
+        """Return the object name for a URL/path served by this backend, or None"""
+
+    def open_reader(self, name, block_size=DEFAULT_READ_BLOCK_SIZE):
+        """Return a seekable binary file object that reads name through read_range()"""
+        info = self.stat(name)
+        if info is None:
+            raise FileNotFoundError(f"{self.bucket_name}/{name}")
+        return io.BufferedReader(RangeReader(self, name, info.size), buffer_size=block_size)
+
+    def check_access(self):
+        """Raise if the bucket cannot be listed"""
+        next(iter(self.iter_pages(page_size=1)), None)
+
+
+class RangeReader(io.RawIOBase):
+    """Raw seekable stream over one object, fetched with ranged reads"""
+
+    def __init__(self, backend, name, size):
+        self.backend = backend
+        self.name = name
+        self.size = size
+        self.position = 0
+
+    def readable(self):
+        return True
+
+    def seekable(self):
+        return True
+
+    def tell(self):
+        return self.position
+
+    def seek(self, offset, whence=io.SEEK_SET):
+        if whence == io.SEEK_SET:
+            position = offset
+        elif whence == io.SEEK_CUR:
+            position = self.position + offset
+        elif whence == io.SEEK_END:
+            position = self.size + offset
+        else:
+            raise ValueError(f"Invalid whence: {whence}")
+        if position < 0:
+            raise ValueError("Negative seek position")
+        self.position = position
+        return position
+
+    def readinto(self, buffer):
+        if self.position >= self.size:
+            return 0
+        end = min(self.size, self.position + len(buffer))
+        data = self.backend.read_range(self.name, self.position, end)
+        buffer[: len(data)] = data
+        self.position += len(data)
+        return len(data)
+
+
+class GCSStorage(StorageBackend):
+    """Google Cloud Storage bucket"""
+
+    # Only ask the API for the fields listings need
+    LIST_FIELDS = "items(name,size,contentType),prefixes,nextPageToken"
+
+    def __init__(self, bucket_name, credentials_path=None, project=None):
+        from google.cloud import storage
+
+        self.bucket_name = bucket_name
+        credentials_path = resolve_credentials_path(credentials_path)
+        if credentials_path:
+            from google.oauth2 import service_account
+
+            credentials = service_account.Credentials.from_service_account_file(credentials_path)
+            self.client = storage.Client(credentials=credentials, project=project or credentials.project_id)
+        else:
+            self.client = storage.Client(project=project)
+        self.bucket = self.client.bucket(bucket_name)
+
+    @staticmethod
+    def split_url(url):
+        """Return (bucket, name) for a GCS public URL or gs:// URI, else (None, None)"""
+        parsed = urlparse(url)
+        path = unquote(parsed.path.lstrip("/"))
+        if parsed.scheme == "gs":
+            return parsed.netloc, path
+        if parsed.scheme in ("http", "https"):
+            if parsed.netloc.endswith(".storage.googleapis.com"):
+                return parsed.netloc[: -len(".storage.googleapis.com")], path
+            if parsed.netloc == "storage.googleapis.com" and "/" in path:
+                bucket, _, name = path.partition("/")
+                return bucket, name
+        return None, None
+
+    def iter_pages(self, prefix="", delimiter=None, page_size=1000):
+        iterator = self.bucket.list_blobs(
+            prefix=prefix or None, delimiter=delimiter, page_size=page_size, fields=self.LIST_FIELDS
+        )
+        seen_prefixes = set()
+        for page in iterator.pages:
+            objects = [ObjectInfo(blob.name, blob.size or 0, blob.content_type) for blob in page]
+            # iterator.prefixes accumulates across pages; report only the new ones
+            new_prefixes = sorted(set(page.prefixes) - seen_prefixes)
+            seen_prefixes.update(new_prefixes)
+            yield ListPage(objects, new_prefixes)
+
+    def stat(self, name):
+        blob = self.bucket.get_blob(name)
+        if blob is None:
+            return None
+        return ObjectInfo(blob.name, blob.size or 0, blob.content_type, blob.metadata or {})
+
+    def read_range(self, name, start=0, end=None):
+        # The GCS API takes an inclusive end offset
+        return self.bucket.blob(name).download_as_bytes(
+            start=start, end=None if end is None else end - 1
+        )
+
+    def upload(self, local_path, name, content_type=None, metadata=None, public=False):
+        blob = self.bucket.blob(name)
+        if metadata:
+            blob.metadata = metadata
+        blob.upload_from_filename(local_path, content_type=content_type)
+        if public:
+            blob.make_public()
+        return blob.public_url
+
+    def public_url(self, name):
+        return f"https://storage.googleapis.com/{self.bucket_name}/{quote(name)}"
+
+    def object_name_from_url(self, url):
+        bucket, name = self.split_url(url)
+        return name if bucket == self.bucket_name else None
+
+
+class LocalStorage(StorageBackend):
+    """Bucket stored as a directory tree: <root>/<bucket>/<object name>.
+
+    Object metadata lives in <root>/.metadata/<bucket>/<name>.json so it does
+    not show up in listings. latency_ms is added to every request and
+    bandwidth_mbps (megabits/s) throttles reads and uploads.
+    """
+
+    def __init__(self, root, bucket_name, latency_ms=0.0, bandwidth_mbps=None, base_url=None):
+        self.root = os.path.abspath(root)
+        self.bucket_name = bucket_name
+        self.bucket_dir = os.path.join(self.root, bucket_name)
+        self.metadata_dir = os.path.join(self.root, ".metadata", bucket_name)
+        self.latency_ms = latency_ms or 0.0
+        self.bandwidth_mbps = bandwidth_mbps
+        self.base_url = base_url.rstrip("/") if base_url else None
+        os.makedirs(self.bucket_dir, exist_ok=True)
+
+    def _simulate(self, num_bytes=0):
+        delay = self.latency_ms / 1000.0
+        if self.bandwidth_mbps and num_bytes:
+            delay += num_bytes * 8 / (self.bandwidth_mbps * 1_000_000)
+        if delay > 0:
+            time.sleep(delay)
+
+    def _path(self, name):
+        path = os.path.abspath(os.path.join(self.bucket_dir, name))
+        if not path.startswith(self.bucket_dir + os.sep):
+            raise ValueError(f"Object name escapes bucket directory: {name}")
+        return path
+
+    def _walk(self, dir_path, dir_name, prefix, delimiter):
+        """Yield (name, size) or (prefix, None) under dir_path in lexicographic name order"""
+        try:
+            entries = list(os.scandir(dir_path))
+        except (FileNotFoundError, NotADirectoryError):
+            # Same as GCS: a prefix that matches nothing lists no objects
+            return
+        keyed = []
+        for entry in entries:
+            is_dir = entry.is_dir()
+            name = dir_name + entry.name + ("/" if is_dir else "")
+            if name.startswith(prefix) or (is_dir and prefix.startswith(name)):
+                keyed.append((name, entry, is_dir))
+        # Sorting on the full name (with trailing "/" for dirs) matches GCS ordering
+        keyed.sort(key=lambda item: item[0])
+        for name, entry, is_dir in keyed:
+            if not is_dir:
+                yield name, entry.stat().st_size
+            elif delimiter == "/" and name.startswith(prefix) and name != prefix:
+                yield name, None
+            else:
+                yield from self._walk(entry.path, name, prefix, delimiter)
+
+    def iter_pages(self, prefix="", delimiter=None, page_size=1000):
+        if delimiter not in (None, "/"):
+            raise ValueError("LocalStorage only supports '/' as delimiter")
+        start_name = prefix[: prefix.rfind("/") + 1]
+        start_dir = self.bucket_dir if not start_name else self._path(start_name)
+        objects, prefixes = [], []
+        for name, size in self._walk(start_dir, start_name, prefix, delimiter):
+            if size is None:
+                prefixes.append(name)
+            else:
+                objects.append(ObjectInfo(name, size))
+            if len(objects) + len(prefixes) >= page_size:
+                self._simulate()
+                yield ListPage(objects, prefixes)
+                objects, prefixes = [], []
+        self._simulate()
+        if objects or prefixes:
+            yield ListPage(objects, prefixes)
+
+    def _metadata_path(self, name):
+        return os.path.join(self.metadata_dir, name + ".json")
+
+    def stat(self, name):
+        self._simulate()
+        path = self._path(name)
+        if not os.path.isfile(path):
+            return None
+        content_type, metadata = None, {}
+        try:
+            with open(self._metadata_path(name), encoding="utf-8") as f:
+                stored = json.load(f)
+            content_type = stored.get("content_type")
+            metadata = stored.get("metadata") or {}
+        except (OSError, ValueError):
+            pass
+        return ObjectInfo(name, os.path.getsize(path), content_type, metadata)
+
+    def read_range(self, name, start=0, end=None):
+        with open(self._path(name), "rb") as f:
+            f.seek(start)
+            data = f.read() if end is None else f.read(max(0, end - start))
+        self._simulate(len(data))
+        return data
+
+    def upload(self, local_path, name, content_type=None, metadata=None, public=False):
+        path = self._path(name)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        shutil.copyfile(local_path, path)
+        meta_path = self._metadata_path(name)
+        os.makedirs(os.path.dirname(meta_path), exist_ok=True)
+        with open(meta_path, "w", encoding="utf-8") as f:
+            json.dump({"content_type": content_type, "metadata": metadata or {}, "public": public}, f)
+        self._simulate(os.path.getsize(path))
+        return self.public_url(name)
+
+    def public_url(self, name):
+        if self.base_url:
+            return f"{self.base_url}/{self.bucket_name}/{quote(name)}"
+        return self._path(name)
+
+    def object_name_from_url(self, url):
+        if self.base_url and url.startswith(self.base_url + "/"):
+            bucket, _, name = url[len(self.base_url) + 1:].partition("/")
+            return unquote(name) if bucket == self.bucket_name else None
+        path = urlparse(url).path if url.startswith("file://") else url
+        path = os.path.abspath(path)
+        if path.startswith(self.bucket_dir + os.sep):
+            return os.path.relpath(path, self.bucket_dir).replace(os.sep, "/")
+        return None
+
+
+def resolve_credentials_path(credentials_path=None):
+    """Explicit path, then GOOGLE_APPLICATION_CREDENTIALS / GCP_KEY_FILE_PATH, then Backend/gcp-credentials.json"""
+    for candidate in (
+        credentials_path,
+        os.environ.get("GOOGLE_APPLICATION_CREDENTIALS"),
+        os.environ.get("GCP_KEY_FILE_PATH"),
+        DEFAULT_CREDENTIALS_PATH,
+    ):
+        if candidate and os.path.exists(candidate):
+            return candidate
+    return None
+
+
+def add_storage_arguments(parser):
+    """Add the shared --storage* options to an argparse parser"""
+    group = parser.add_argument_group("storage")
+    group.add_argument("--storage", choices=["gcs", "local"], default=os.environ.get("CAPTION_STORAGE", "gcs"),
+                       help="Storage backend (default: $CAPTION_STORAGE or gcs)")
+    group.add_argument("--storage-root", default=os.environ.get("CAPTION_STORAGE_ROOT"),
+                       help="Root directory for --storage local; buckets are sub-directories")
+    group.add_argument("--storage-base-url", default=os.environ.get("CAPTION_STORAGE_BASE_URL"),
+                       help="Public URL prefix for --storage local (default: file paths)")
+    group.add_argument("--simulate-latency-ms", type=float, default=0.0,
+                       help="Local storage: added latency per request in milliseconds")
+    group.add_argument("--simulate-bandwidth-mbps", type=float, default=None,
+                       help="Local storage: throughput limit in megabits per second")
+    group.add_argument("--credentials", default=None,
+                       help="GCS service account JSON (default: $GOOGLE_APPLICATION_CREDENTIALS or Backend/gcp-credentials.json)")
+    group.add_argument("--project", default=os.environ.get("GCP_PROJECT_ID"),
+                       help="GCP project ID (default: $GCP_PROJECT_ID or the credentials' project)")
+    return group
+
+
+def open_storage(args, bucket_name):
+    """Create the backend selected by add_storage_arguments() options for bucket_name"""
+    backend = getattr(args, "storage", None) or os.environ.get("CAPTION_STORAGE", "gcs")
+    if backend == "local":
+        root = getattr(args, "storage_root", None) or os.environ.get("CAPTION_STORAGE_ROOT")
+        if not root:
+            raise ValueError("--storage local requires --storage-root or CAPTION_STORAGE_ROOT")
+        return LocalStorage(
+            root,
+            bucket_name,
+            latency_ms=getattr(args, "simulate_latency_ms", 0.0),
+            bandwidth_mbps=getattr(args, "simulate_bandwidth_mbps", None),
+            base_url=getattr(args, "storage_base_url", None),
+        )
+    if backend == "gcs":
+        return GCSStorage(
+            bucket_name,
+            credentials_path=getattr(args, "credentials", None),
+            project=getattr(args, "project", None),
+        )
+    raise ValueError(f"Unknown storage backend: {backend}")
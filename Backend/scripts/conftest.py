@@ -0,0 +1,3 @@
+# test_caption_deps.py and quick_caption_test.py are manual checks against a
+# real bucket and model, not pytest tests
+collect_ignore = ["test_caption_deps.py", "quick_caption_test.py"]
@@ -1,58 +1,347 @@
 #!/usr/bin/env python3
 """
-Debug script to list GCS bucket contents for video assets
+Debug script to inspect bucket contents for video assets.
+
+Listings are streamed page by page with a fields mask, sub-prefixes are
+listed in parallel, and objects are folded into per-asset / per-rendition
+summaries as they arrive. Each asset is written out as one JSON line as
+soon as its listing is complete, so a whole bucket can be scanned without
+holding every object name in memory.
+
+Asset layout: assets/<admin_id>/<course_id>/<asset_id>/...
+    master.m3u8                 HLS master playlist
+    <rendition>/index.m3u8      rendition playlist (480, 720, 1080, ...)
+    <rendition>/<segment>.ts    HLS segments
+    captions_<lang>.vtt         caption tracks
 """
 
-import os
+import argparse
+import json
 import sys
-from google.cloud import storage
-from google.oauth2 import service_account
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from caption_storage import add_storage_arguments, open_storage
 
-def list_bucket_contents(bucket_name, prefix=""):
-    """List all objects in a GCS bucket with optional prefix"""
-    try:
-        # Load credentials
-        credentials_path = "/Users/smitthakkar/Downloads/SIH/Backend/gcp-credentials.json"
-        credentials = service_account.Credentials.from_service_account_file(credentials_path)
-        
-        # Initialize client
-        client = storage.Client(credentials=credentials, project="dev-airlock-471717-b0")
-        bucket = client.bucket(bucket_name)
-        
-        print(f"🔍 Listing contents of bucket: {bucket_name}")
-        if prefix:
-            print(f"📁 Prefix: {prefix}")
-        print("-" * 80)
-        
-        # List objects
-        blobs = bucket.list_blobs(prefix=prefix)
-        found_objects = []
-        
-        for blob in blobs:
-            size_mb = blob.size / (1024 * 1024) if blob.size else 0
-            print(f"📄 {blob.name} ({size_mb:.2f} MB)")
-            found_objects.append(blob.name)
-        
-        if not found_objects:
-            print("❌ No objects found!")
+# Number of path components that identify one asset: assets/<admin>/<course>/<asset>
+ASSET_DEPTH = 4
+SEGMENT_EXTENSIONS = (".ts", ".m4s", ".aac", ".mp4")
+
+_thread_state = threading.local()
+_output_lock = threading.Lock()
+
+
+def get_storage(bucket_name, storage_args=None):
+    """Return a per-thread storage backend (storage clients are not shared across threads).
+
+    storage_args are the add_storage_arguments() options (None uses the
+    CAPTION_STORAGE* environment). They are fixed for a run, so backends are
+    cached per thread by bucket name only.
+    """
+    cache = getattr(_thread_state, "storage", None)
+    if cache is None:
+        cache = _thread_state.storage = {}
+    if bucket_name not in cache:
+        cache[bucket_name] = open_storage(storage_args, bucket_name)
+    return cache[bucket_name]
+
+
+def emit(record):
+    """Write one JSON record per line to stdout"""
+    with _output_lock:
+        sys.stdout.write(json.dumps(record, ensure_ascii=False) + "\n")
+        sys.stdout.flush()
+
+
+def log(message):
+    """Progress and errors go to stderr so stdout stays valid JSON lines"""
+    with _output_lock:
+        print(message, file=sys.stderr)
+        sys.stderr.flush()
+
+
+def prefix_depth(prefix):
+    return len([p for p in prefix.split("/") if p])
+
+
+def split_asset_name(name):
+    """Split an object name into (asset_key, relative_path), or (None, name) outside the asset layout"""
+    parts = name.split("/")
+    if len(parts) <= ASSET_DEPTH or parts[0] != "assets":
+        return None, name
+    return "/".join(parts[:ASSET_DEPTH]), "/".join(parts[ASSET_DEPTH:])
+
+
+class AssetStats:
+    """Running totals for a single asset"""
+
+    def __init__(self, key):
+        self.key = key
+        self.objects = 0
+        self.bytes = 0
+        self.has_master = False
+        self.captions = []
+        self.renditions = {}
+        self.other_objects = 0
+
+    def add(self, rel_path, size):
+        self.objects += 1
+        self.bytes += size
+        if rel_path == "master.m3u8":
+            self.has_master = True
+        elif "/" not in rel_path and rel_path.startswith("captions_") and rel_path.endswith(".vtt"):
+            self.captions.append(rel_path[len("captions_"):-len(".vtt")])
+        elif "/" in rel_path:
+            rendition, _, filename = rel_path.partition("/")
+            stats = self.renditions.setdefault(
+                rendition, {"segments": 0, "bytes": 0, "has_playlist": False}
+            )
+            stats["bytes"] += size
+            if filename == "index.m3u8":
+                stats["has_playlist"] = True
+            elif filename.lower().endswith(SEGMENT_EXTENSIONS):
+                stats["segments"] += 1
         else:
-            print(f"\n✅ Found {len(found_objects)} objects")
-            
-        return found_objects
-        
+            self.other_objects += 1
+
+    def missing(self):
+        missing = []
+        if not self.has_master:
+            missing.append("master.m3u8")
+        for rendition in sorted(self.renditions):
+            stats = self.renditions[rendition]
+            if stats["segments"] and not stats["has_playlist"]:
+                missing.append(f"{rendition}/index.m3u8")
+        if not self.captions:
+            missing.append("captions")
+        return missing
+
+    def to_record(self):
+        return {
+            "type": "asset",
+            "asset": self.key,
+            "objects": self.objects,
+            "bytes": self.bytes,
+            "has_master": self.has_master,
+            "captions": sorted(self.captions),
+            "renditions": {r: self.renditions[r] for r in sorted(self.renditions)},
+            "other_objects": self.other_objects,
+            "missing": self.missing(),
+        }
+
+
+class ScanTotals:
+    """Bucket-wide counters; merged from every listing worker"""
+
+    def __init__(self):
+        self.objects = 0
+        self.bytes = 0
+        self.assets = 0
+        self.incomplete_assets = 0
+        self.segments = 0
+        self.unassigned_objects = 0
+        self.unassigned_bytes = 0
+        self.pages = 0
+        self.errors = []
+
+    def merge(self, other):
+        self.objects += other.objects
+        self.bytes += other.bytes
+        self.assets += other.assets
+        self.incomplete_assets += other.incomplete_assets
+        self.segments += other.segments
+        self.unassigned_objects += other.unassigned_objects
+        self.unassigned_bytes += other.unassigned_bytes
+        self.pages += other.pages
+        self.errors.extend(other.errors)
+
+
+def finish_asset(asset, totals, only_incomplete):
+    record = asset.to_record()
+    totals.assets += 1
+    totals.segments += sum(r["segments"] for r in asset.renditions.values())
+    if record["missing"]:
+        totals.incomplete_assets += 1
+    if record["missing"] or not only_incomplete:
+        emit(record)
+
+
+def scan_prefix(bucket_name, prefix, page_size, only_incomplete, storage_args=None):
+    """Stream every object under prefix and emit one record per asset.
+
+    Listings return names in lexicographic order, so an asset is complete as soon
+    as a name from a different asset shows up; only the current asset is kept
+    in memory.
+    """
+    totals = ScanTotals()
+    current = None
+    try:
+        backend = get_storage(bucket_name, storage_args)
+        for page in backend.iter_pages(prefix, page_size=page_size):
+            totals.pages += 1
+            for obj in page.objects:
+                size = obj.size or 0
+                totals.objects += 1
+                totals.bytes += size
+                key, rel_path = split_asset_name(obj.name)
+                if key is None:
+                    totals.unassigned_objects += 1
+                    totals.unassigned_bytes += size
+                    continue
+                if current is None or current.key != key:
+                    if current is not None:
+                        finish_asset(current, totals, only_incomplete)
+                    current = AssetStats(key)
+                current.add(rel_path, size)
+        if current is not None:
+            finish_asset(current, totals, only_incomplete)
     except Exception as e:
-        print(f"❌ Error listing bucket contents: {e}")
-        return []
+        log(f"❌ Error listing prefix '{prefix}': {e}")
+        totals.errors.append({"prefix": prefix, "error": str(e)})
+    return totals
+
+
+def list_sub_prefixes(bucket_name, prefix, page_size, storage_args=None):
+    """Return (sub_prefixes, direct_object_count) for one level below prefix"""
+    backend = get_storage(bucket_name, storage_args)
+    sub_prefixes = []
+    direct_objects = 0
+    for page in backend.iter_pages(prefix, delimiter="/", page_size=page_size):
+        direct_objects += len(page.objects)
+        sub_prefixes.extend(page.prefixes)
+    return sorted(sub_prefixes), direct_objects
+
+
+def plan_prefixes(bucket_name, prefix, split_depth, page_size, pool, totals, storage_args=None):
+    """Expand prefix into disjoint listing units that can be scanned in parallel.
+
+    Each level's delimiter listings run on the pool. Prefixes are never split
+    below the asset level so one asset is always listed by a single worker.
+    Objects sitting directly at a split level are covered by a non-recursive
+    unit so nothing is skipped. A prefix whose listing fails is recorded in
+    totals.errors and left out of the plan.
+    """
+    units = []
+    frontier = [prefix]
+    for _ in range(split_depth):
+        to_split = []
+        for current in frontier:
+            if current and (not current.endswith("/") or prefix_depth(current) >= ASSET_DEPTH):
+                units.append((current, False))
+            else:
+                to_split.append(current)
+        futures = {
+            pool.submit(list_sub_prefixes, bucket_name, current, page_size, storage_args): current
+            for current in to_split
+        }
+        next_frontier = []
+        for future in as_completed(futures):
+            current = futures[future]
+            try:
+                sub_prefixes, direct_objects = future.result()
+            except Exception as e:
+                log(f"❌ Error listing prefix '{current}': {e}")
+                totals.errors.append({"prefix": current, "error": str(e)})
+                continue
+            if direct_objects:
+                units.append((current, True))
+            next_frontier.extend(sub_prefixes)
+        frontier = sorted(next_frontier)
+    units.extend((p, False) for p in frontier)
+    return units
+
+
+def scan_direct_objects(bucket_name, prefix, page_size, only_incomplete, storage_args=None):
+    """Scan only the objects directly under prefix (not inside sub-prefixes)"""
+    totals = ScanTotals()
+    try:
+        backend = get_storage(bucket_name, storage_args)
+        for page in backend.iter_pages(prefix, delimiter="/", page_size=page_size):
+            totals.pages += 1
+            for obj in page.objects:
+                totals.objects += 1
+                totals.bytes += obj.size or 0
+                totals.unassigned_objects += 1
+                totals.unassigned_bytes += obj.size or 0
+    except Exception as e:
+        log(f"❌ Error listing prefix '{prefix}': {e}")
+        totals.errors.append({"prefix": prefix, "error": str(e)})
+    return totals
+
+
+def inspect_bucket(bucket_name, prefix="", workers=8, split_depth=3, page_size=1000, only_incomplete=False,
+                   storage_args=None):
+    """Scan bucket_name under prefix and emit JSON lines; returns the summary record.
+
+    storage_args selects the backend like open_storage() (None: CAPTION_STORAGE* environment).
+    """
+    start_time = time.time()
+    log(f"🔍 Inspecting bucket: {bucket_name}" + (f" (prefix: {prefix})" if prefix else ""))
+
+    totals = ScanTotals()
+    with ThreadPoolExecutor(max_workers=max(1, workers)) as pool:
+        units = plan_prefixes(bucket_name, prefix, split_depth, page_size, pool, totals, storage_args)
+        log(f"📁 Listing {len(units)} prefixes with {workers} workers")
+
+        futures = []
+        for unit_prefix, direct_only in units:
+            scanner = scan_direct_objects if direct_only else scan_prefix
+            futures.append(pool.submit(scanner, bucket_name, unit_prefix, page_size, only_incomplete, storage_args))
+        for done, future in enumerate(as_completed(futures), 1):
+            totals.merge(future.result())
+            if done % 50 == 0:
+                log(f"⏳ {done}/{len(futures)} prefixes done, {totals.objects} objects so far")
+
+    summary = {
+        "type": "summary",
+        "bucket": bucket_name,
+        "prefix": prefix,
+        "objects": totals.objects,
+        "bytes": totals.bytes,
+        "assets": totals.assets,
+        "incomplete_assets": totals.incomplete_assets,
+        "segments": totals.segments,
+        "unassigned_objects": totals.unassigned_objects,
+        "unassigned_bytes": totals.unassigned_bytes,
+        "pages": totals.pages,
+        "prefixes_scanned": len(units),
+        "errors": totals.errors,
+        "elapsed_seconds": round(time.time() - start_time, 3),
+    }
+    emit(summary)
+
+    if totals.objects == 0:
+        log("❌ No objects found!")
+    else:
+        log(f"✅ Scanned {totals.objects} objects in {totals.assets} assets "
+            f"({totals.incomplete_assets} incomplete) in {summary['elapsed_seconds']}s")
+    return summary
+
 
 def main():
-    if len(sys.argv) < 2:
-        print("Usage: python debug_gcs_bucket.py <bucket_name> [prefix]")
-        sys.exit(1)
-    
-    bucket_name = sys.argv[1]
-    prefix = sys.argv[2] if len(sys.argv) > 2 else ""
-    
-    list_bucket_contents(bucket_name, prefix)
+    p = argparse.ArgumentParser(description="Inspect HLS/caption assets in a bucket and emit JSON lines")
+    p.add_argument("bucket", help="Bucket name")
+    p.add_argument("prefix", nargs="?", default="", help="Object prefix to inspect (default: whole bucket)")
+    p.add_argument("--workers", type=int, default=8, help="Parallel listing workers")
+    p.add_argument("--split-depth", type=int, default=3,
+                   help="How many prefix levels to expand into parallel listings (never below asset level)")
+    p.add_argument("--page-size", type=int, default=1000, help="Objects per listing page")
+    p.add_argument("--only-incomplete", action="store_true",
+                   help="Only emit assets with missing playlists or captions")
+    add_storage_arguments(p)
+    args = p.parse_args()
+
+    summary = inspect_bucket(
+        args.bucket,
+        args.prefix,
+        workers=args.workers,
+        split_depth=args.split_depth,
+        page_size=args.page_size,
+        only_incomplete=args.only_incomplete,
+        storage_args=args,
+    )
+    sys.exit(1 if summary["errors"] else 0)
+
 
 if __name__ == "__main__":
     main()
@@ -5,8 +5,11 @@ Quick caption generation test - verifies setup without downloading models
 import sys
 import os
 
+# Public bucket to check access to (same variable the Node backend uses)
+PUBLIC_BUCKET = os.environ.get("GCS_PUBLIC_BUCKET")
+
 def test_basic_setup():
-    """Test basic Python imports and GCP setup"""
+    """Test basic Python imports and storage setup"""
     print("Testing Caption Generation Setup")
     print("=" * 35)
     
@@ -18,37 +21,41 @@ def test_basic_setup():
         print(f"❌ faster-whisper missing: {e}")
         return False
     
-    try:
-        from google.cloud import storage
-        print("✅ google-cloud-storage available")
-    except ImportError as e:
-        print(f"❌ google-cloud-storage missing: {e}")
-        return False
+    from caption_storage import open_storage, resolve_credentials_path
+    backend = os.environ.get("CAPTION_STORAGE", "gcs")
     
-    # Test GCP credentials
-    creds_path = "/Users/smitthakkar/Downloads/SIH/Backend/gcp-credentials.json"
-    if not os.path.exists(creds_path):
-        print(f"❌ GCP credentials not found: {creds_path}")
-        return False
-    print("✅ GCP credentials file found")
+    if backend == "gcs":
+        try:
+            from google.cloud import storage
+            print("✅ google-cloud-storage available")
+        except ImportError as e:
+            print(f"❌ google-cloud-storage missing: {e}")
+            return False
+        
+        # Test GCP credentials
+        creds_path = resolve_credentials_path()
+        if not creds_path:
+            print("❌ GCP credentials not found (set GOOGLE_APPLICATION_CREDENTIALS)")
+            return False
+        print(f"✅ GCP credentials file found: {creds_path}")
     
-    # Test GCP connection
+    # Test storage connection
+    if not PUBLIC_BUCKET:
+        print("❌ GCS_PUBLIC_BUCKET is not set (bucket to check access to)")
+        return False
     try:
-        os.environ['GOOGLE_APPLICATION_CREDENTIALS'] = creds_path
-        client = storage.Client()
-        bucket = client.bucket("dev-airlock-471717-b0-vod-public")
-        # Just check if bucket exists, don't list contents
-        bucket.reload()
-        print("✅ GCP bucket accessible")
+        # Only fetch a single listing entry, don't list contents
+        open_storage(None, PUBLIC_BUCKET).check_access()
+        print(f"✅ {backend} bucket accessible")
     except Exception as e:
-        print(f"❌ GCP connection failed: {e}")
+        print(f"❌ {backend} storage connection failed: {e}")
         return False
     
     return True
 
 def test_script_permissions():
     """Test if transcription script is executable"""
-    script_path = "/Users/smitthakkar/Downloads/SIH/Backend/scripts/transcribe_to_vtt.py"
+    script_path = os.path.join(os.path.dirname(os.path.abspath(__file__)), "transcribe_to_vtt.py")
     if not os.path.exists(script_path):
         print(f"❌ Transcription script not found: {script_path}")
         return False
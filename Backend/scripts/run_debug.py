@@ -1,12 +1,26 @@
 #!/usr/bin/env python3
+import argparse
+import json
+import os
 import subprocess
 import sys
 
+p = argparse.ArgumentParser(
+    description="Run debug_gcs_bucket.py for one video asset and pretty-print the result",
+    epilog="Any other options (e.g. --storage local --storage-root DIR) are passed to debug_gcs_bucket.py",
+)
+p.add_argument("asset_prefix", help="Asset prefix, e.g. assets/<admin_id>/<course_id>/<asset_id>")
+p.add_argument("--bucket", default=os.environ.get("GCS_PUBLIC_BUCKET"),
+               help="Bucket name (default: $GCS_PUBLIC_BUCKET)")
+args, passthrough = p.parse_known_args()
+if not args.bucket:
+    p.error("no bucket given: pass --bucket or set GCS_PUBLIC_BUCKET")
+
 # Run the debug script for the failing video asset
-bucket_name = "dev-airlock-471717-b0-vod-public"
-asset_prefix = "assets/689897f742b2a2c9c879dda7/68c3404bfe45d3b81afbe8c1/68c358d7c2ba0b5e3691b43b"
+bucket_name = args.bucket
+asset_prefix = args.asset_prefix
 
-print(f"🔍 Debugging GCS bucket contents for failing video asset...")
+print(f"🔍 Debugging bucket contents for failing video asset...")
 print(f"Bucket: {bucket_name}")
 print(f"Asset: {asset_prefix}")
 print("-" * 80)
@@ -14,13 +28,20 @@ print("-" * 80)
 try:
     result = subprocess.run([
         sys.executable, 
-        "/Users/smitthakkar/Downloads/SIH/Backend/scripts/debug_gcs_bucket.py",
+        os.path.join(os.path.dirname(os.path.abspath(__file__)), "debug_gcs_bucket.py"),
         bucket_name,
-        asset_prefix
-    ], capture_output=True, text=True, timeout=30)
+        asset_prefix,
+        *passthrough
+    ], capture_output=True, text=True, timeout=600)  # Listings stream page by page; only guard against hangs
     
-    print("STDOUT:")
-    print(result.stdout)
+    print("ASSETS:")
+    for line in result.stdout.splitlines():
+        try:
+            record = json.loads(line)
+        except ValueError:
+            print(line)
+            continue
+        print(json.dumps(record, indent=2, ensure_ascii=False))
     
     if result.stderr:
         print("STDERR:")
@@ -5,6 +5,9 @@ Test script to verify caption generation dependencies and GCP connection
 import sys
 import os
 
+# Public bucket to check access to (same variable the Node backend uses)
+PUBLIC_BUCKET = os.environ.get("GCS_PUBLIC_BUCKET")
+
 def test_imports():
     """Test if all required packages can be imported"""
     print("Testing Python imports...")
@@ -16,47 +19,49 @@ def test_imports():
         print(f"✗ faster-whisper import failed: {e}")
         return False
     
-    try:
-        from google.cloud import storage
-        print("✓ google-cloud-storage imported successfully")
-    except ImportError as e:
-        print(f"✗ google-cloud-storage import failed: {e}")
-        return False
+    if os.environ.get("CAPTION_STORAGE", "gcs") == "gcs":
+        try:
+            from google.cloud import storage
+            print("✓ google-cloud-storage imported successfully")
+        except ImportError as e:
+            print(f"✗ google-cloud-storage import failed: {e}")
+            return False
     
     return True
 
 def test_gcp_connection():
-    """Test GCP connection and credentials"""
-    print("\nTesting GCP connection...")
+    """Test storage connection and credentials"""
+    backend = os.environ.get("CAPTION_STORAGE", "gcs")
+    print(f"\nTesting {backend} storage connection...")
     
     try:
-        from google.cloud import storage
+        from caption_storage import open_storage, resolve_credentials_path
         
-        # Check if credentials file exists
-        creds_path = "/Users/smitthakkar/Downloads/SIH/Backend/gcp-credentials.json"
-        if not os.path.exists(creds_path):
-            print(f"✗ GCP credentials file not found at: {creds_path}")
-            return False
+        if backend == "gcs":
+            # Check if credentials file exists
+            creds_path = resolve_credentials_path()
+            if not creds_path:
+                print("✗ GCP credentials file not found (set GOOGLE_APPLICATION_CREDENTIALS)")
+                return False
+            
+            print(f"✓ GCP credentials file found: {creds_path}")
         
-        print(f"✓ GCP credentials file found")
+        if not PUBLIC_BUCKET:
+            print("✗ GCS_PUBLIC_BUCKET is not set (bucket to check access to)")
+            return False
         
         # Test storage client initialization
-        os.environ['GOOGLE_APPLICATION_CREDENTIALS'] = creds_path
-        client = storage.Client()
-        print("✓ GCP Storage client initialized successfully")
-        
-        # Test bucket access
-        bucket_name = "dev-airlock-471717-b0-vod-public"
-        bucket = client.bucket(bucket_name)
+        storage_backend = open_storage(None, PUBLIC_BUCKET)
+        print(f"✓ {backend} storage client initialized successfully")
         
-        # Try to list a few objects (this will fail if no access)
-        blobs = list(bucket.list_blobs(max_results=1))
-        print(f"✓ Successfully accessed bucket: {bucket_name}")
+        # Try to list a single object (this will fail if no access)
+        storage_backend.check_access()
+        print(f"✓ Successfully accessed bucket: {PUBLIC_BUCKET}")
         
         return True
         
     except Exception as e:
-        print(f"✗ GCP connection failed: {e}")
+        print(f"✗ Storage connection failed: {e}")
         return False
 
 def test_whisper_model():
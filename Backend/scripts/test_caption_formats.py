@@ -0,0 +1,70 @@
+"""
+Tests for word timings and cue building in caption_formats.py.
+
+    cd Backend/scripts && python3 -m pytest -q
+"""
+
+from caption_formats import WordTimings, build_cues, render_vtt
+
+
+def make_timings(words, spacing=0.3, duration=0.25, start=0.0, language=None):
+    timings = WordTimings(language=language)
+    for i, word in enumerate(words):
+        t = start + i * spacing
+        timings.append(word, t, t + duration)
+    return timings
+
+
+def test_build_cues_respects_line_and_duration_limits():
+    timings = make_timings([f"word{i % 10}" for i in range(200)])
+    cues = build_cues(timings, max_chars_per_line=20, max_lines=2, max_duration=3.0)
+    assert sum(len(" ".join(c.lines).split()) for c in cues) == 200
+    for cue in cues:
+        assert 1 <= len(cue.lines) <= 2
+        assert all(len(line) <= 20 for line in cue.lines)
+        assert cue.end_ms - cue.start_ms <= 3000
+
+
+def test_build_cues_keeps_min_gap_between_cues():
+    # Back-to-back words with no pause, so every cue boundary needs trimming
+    timings = make_timings([f"w{i}" for i in range(60)], spacing=0.2, duration=0.2)
+    cues = build_cues(timings, max_chars_per_line=10, max_lines=1, min_gap=0.08)
+    assert len(cues) > 1
+    for prev, cue in zip(cues, cues[1:]):
+        assert cue.start_ms - prev.end_ms >= 80
+        assert prev.end_ms >= prev.start_ms
+
+
+def test_build_cues_sentence_break_needs_half_a_line():
+    # "Hi." is under half of a 20 character line, so the sentence continues in the same cue
+    timings = make_timings(["Hi.", "Come", "in.", "Sit", "down."])
+    cues = build_cues(timings, max_chars_per_line=20)
+    assert [c.lines for c in cues] == [["Hi. Come in."], ["Sit down."]]
+
+
+def test_build_cues_splits_on_pause_and_sentence_end():
+    timings = make_timings(["Hello", "there."])
+    timings.append("General", 0.6, 0.9)
+    timings.append("Kenobi", 5.0, 5.4)
+    cues = build_cues(timings, max_chars_per_line=10, pause_split=1.0)
+    assert [c.lines for c in cues] == [["Hello", "there."], ["General"], ["Kenobi"]]
+
+
+def test_build_cues_splits_and_tags_language_changes():
+    timings = WordTimings(language="mul")
+    timings.append("hello", 0.0, 0.3, "en")
+    timings.append("world", 0.3, 0.6, "en")
+    timings.append("namaste", 0.6, 0.9, "hi")
+    cues = build_cues(timings)
+    assert [(c.lines, c.language) for c in cues] == [(["hello world"], "en"), (["namaste"], "hi")]
+    assert "<lang hi>namaste</lang>" in render_vtt(cues)
+
+
+def test_word_timings_round_trip(tmp_path):
+    timings = make_timings(["a", "b", "c"], language="en")
+    path = tmp_path / "words_en.json"
+    timings.save(str(path))
+    loaded = WordTimings.load(str(path))
+    assert loaded.words == ["a", "b", "c"]
+    assert loaded.start_ms.tolist() == timings.start_ms.tolist()
+    assert loaded.language == "en"
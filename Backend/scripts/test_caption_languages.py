@@ -0,0 +1,73 @@
+"""
+Tests for the code-mixed (--lang auto) helpers in caption_languages.py (no model needed).
+
+    cd Backend/scripts && python3 -m pytest -q
+"""
+
+from collections import namedtuple
+
+from caption_languages import (
+    SAMPLING_RATE, ChunkTimeline, CodeMixedInfo, SpeechChunk, group_chunks_by_language, split_segment_at_chunks,
+)
+
+Segment = namedtuple("Segment", ["start", "end", "text", "words"])
+Word = namedtuple("Word", ["word", "start", "end"])
+
+
+def chunk(start, end, language):
+    c = SpeechChunk(int(start * SAMPLING_RATE), int(end * SAMPLING_RATE))
+    c.language = language
+    return c
+
+
+def test_chunk_timeline_maps_back_to_original_times():
+    # Speech at 10-12s and 20-23s, concatenated into 5 seconds of audio
+    chunks = [SpeechChunk(10 * SAMPLING_RATE, 12 * SAMPLING_RATE), SpeechChunk(20 * SAMPLING_RATE, 23 * SAMPLING_RATE)]
+    timeline = ChunkTimeline(chunks)
+    assert timeline.to_original(0.0) == 10.0
+    assert timeline.to_original(1.5) == 11.5
+    assert timeline.to_original(2.5) == 20.5
+    # A boundary time starts the next chunk but ends the previous one
+    assert timeline.to_original(2.0) == 20.0
+    assert timeline.to_original(2.0, is_end=True) == 12.0
+    # Times past the end are clamped to the last chunk
+    assert timeline.to_original(9.0) == 23.0
+
+
+def test_interleaved_chunks_never_overlap_other_languages():
+    # en 0-10s, hi 10-20s, en 20-30s: the English group is 20s of concatenated audio
+    chunks = [chunk(0, 10, "en"), chunk(10, 20, "hi"), chunk(20, 30, "en")]
+    groups = group_chunks_by_language(chunks)
+    assert [c.start for c in groups["en"]] == [0, 20 * SAMPLING_RATE]
+    timeline = ChunkTimeline(groups["en"])
+
+    # One Whisper segment across the join at concatenated 10s
+    segment = Segment(8.0, 12.0, " so the answer is", [
+        Word(" so", 8.0, 8.5), Word(" the", 8.6, 9.2), Word(" answer", 10.1, 10.9), Word(" is", 11.0, 12.0),
+    ])
+    pieces = split_segment_at_chunks(timeline, segment, "en")
+    assert [(p.start, p.end, p.text) for p in pieces] == [(8.0, 9.2, " so the"), (20.1, 22.0, " answer is")]
+    assert all(p.language == "en" for p in pieces)
+    assert [w.start for w in pieces[1].words] == [20.1, 21.0]
+    hindi = chunks[1]
+    for piece in pieces:
+        assert piece.end <= hindi.start / SAMPLING_RATE or piece.start >= hindi.end / SAMPLING_RATE
+
+
+def test_split_segment_inside_one_chunk_keeps_whisper_bounds():
+    timeline = ChunkTimeline([chunk(0, 10, "en"), chunk(20, 30, "en")])
+    segment = Segment(11.0, 14.0, " hello world", [Word(" hello", 11.2, 12.0), Word(" world", 12.1, 13.5)])
+    (piece,) = split_segment_at_chunks(timeline, segment, "en", keep_words=False)
+    assert (piece.start, piece.end, piece.text, piece.words) == (21.0, 24.0, " hello world", None)
+
+
+def test_split_segment_without_words_is_clamped_to_its_chunk():
+    timeline = ChunkTimeline([chunk(0, 10, "en"), chunk(20, 30, "en")])
+    (piece,) = split_segment_at_chunks(timeline, Segment(8.0, 12.0, " text", None), "en")
+    assert (piece.start, piece.end) == (8.0, 10.0)
+
+
+def test_code_mixed_info_reports_dominant_language():
+    info = CodeMixedInfo(30.0, [chunk(0, 8, "en"), chunk(8, 24, "hi"), chunk(24, 30, "en")], 0.1, 0.1, 0.2)
+    assert info.language_seconds == {"en": 14.0, "hi": 16.0}
+    assert info.language == "hi"
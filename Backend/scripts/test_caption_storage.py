@@ -0,0 +1,80 @@
+"""
+Tests for the caption storage backends (LocalStorage and URL parsing only, no GCS access).
+
+    cd Backend/scripts && python3 -m pytest -q
+"""
+
+import time
+
+import pytest
+
+from caption_storage import GCSStorage, LocalStorage
+
+
+@pytest.fixture
+def local_storage(tmp_path):
+    backend = LocalStorage(str(tmp_path), "bucket")
+    src = tmp_path / "src.txt"
+    src.write_bytes(b"12345")
+    for name in [
+        "assets/a/c/v1/master.m3u8",
+        "assets/a/c/v1/720/index.m3u8",
+        "assets/a/c/v1/720/seg0.ts",
+        "assets/a/c/v1-old/master.m3u8",
+        "assets/a/c/v1.txt",
+        "readme.txt",
+    ]:
+        backend.upload(str(src), name)
+    return backend
+
+
+def test_local_storage_lists_in_lexicographic_order(local_storage):
+    names = [obj.name for obj in local_storage.list_objects("assets/", page_size=2)]
+    assert names == sorted(names)
+    # "v1-old/" and "v1.txt" sort before "v1/" by full name, as in GCS
+    assert names[0] == "assets/a/c/v1-old/master.m3u8"
+    assert len(names) == 5
+
+
+def test_local_storage_delimiter_listing(local_storage):
+    pages = list(local_storage.iter_pages("assets/a/c/", delimiter="/"))
+    prefixes = [p for page in pages for p in page.prefixes]
+    objects = [o.name for page in pages for o in page.objects]
+    assert prefixes == ["assets/a/c/v1-old/", "assets/a/c/v1/"]
+    assert objects == ["assets/a/c/v1.txt"]
+
+
+def test_local_storage_prefix_through_file_lists_nothing(local_storage):
+    assert list(local_storage.iter_pages("readme.txt/", delimiter="/")) == []
+    assert list(local_storage.iter_pages("missing/")) == []
+
+
+def test_local_storage_ranged_reads(local_storage):
+    assert local_storage.read_range("readme.txt", 1, 3) == b"23"
+    with local_storage.open_reader("readme.txt", block_size=2) as reader:
+        assert reader.read() == b"12345"
+
+
+def test_local_storage_simulates_bandwidth(tmp_path):
+    src = tmp_path / "src.bin"
+    src.write_bytes(b"x" * 250_000)
+    backend = LocalStorage(str(tmp_path), "bucket", bandwidth_mbps=10)
+    backend.upload(str(src), "media.mp4")
+    start = time.time()
+    assert len(backend.read_range("media.mp4")) == 250_000
+    # 250KB at 10Mbit/s takes about 0.2s
+    assert time.time() - start >= 0.15
+
+
+def test_local_storage_object_name_from_url(local_storage):
+    assert local_storage.object_name_from_url(local_storage.public_url("readme.txt")) == "readme.txt"
+    assert local_storage.object_name_from_url("https://example.com/readme.txt") is None
+
+
+@pytest.mark.parametrize("url, expected", [
+    ("gs://bucket/assets/a/master.m3u8", ("bucket", "assets/a/master.m3u8")),
+    ("https://bucket.storage.googleapis.com/assets/a/master.m3u8", ("bucket", "assets/a/master.m3u8")),
+    ("https://storage.googleapis.com/bucket/assets/a%20b.mp4", ("bucket", "assets/a b.mp4")),
+])
+def test_gcs_split_url(url, expected):
+    assert GCSStorage.split_url(url) == expected
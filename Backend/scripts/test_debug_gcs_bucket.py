@@ -0,0 +1,66 @@
+"""
+Tests for the bucket inspector, run against LocalStorage.
+
+    cd Backend/scripts && python3 -m pytest -q
+"""
+
+import argparse
+import json
+
+from caption_storage import LocalStorage
+from debug_gcs_bucket import AssetStats, inspect_bucket, split_asset_name
+
+
+def test_split_asset_name():
+    assert split_asset_name("assets/a/c/v1/720/seg0.ts") == ("assets/a/c/v1", "720/seg0.ts")
+    assert split_asset_name("assets/a/c/v1") == (None, "assets/a/c/v1")
+    assert split_asset_name("thumbnails/a.jpg") == (None, "thumbnails/a.jpg")
+
+
+def test_asset_stats_reports_missing_parts():
+    asset = AssetStats("assets/a/c/v1")
+    asset.add("480/seg0.ts", 10)
+    asset.add("720/index.m3u8", 1)
+    asset.add("720/seg0.ts", 10)
+    assert asset.missing() == ["master.m3u8", "480/index.m3u8", "captions"]
+
+    asset.add("master.m3u8", 1)
+    asset.add("480/index.m3u8", 1)
+    asset.add("captions_en.vtt", 5)
+    assert asset.missing() == []
+    record = asset.to_record()
+    assert record["captions"] == ["en"]
+    assert record["renditions"]["480"] == {"segments": 1, "bytes": 11, "has_playlist": True}
+
+
+def test_inspect_bucket_emits_one_record_per_asset(tmp_path, capsys):
+    backend = LocalStorage(str(tmp_path), "bucket")
+    src = tmp_path / "src.bin"
+    src.write_bytes(b"x" * 10)
+    for name in [
+        "assets/a/c/v1/master.m3u8",
+        "assets/a/c/v1/720/index.m3u8",
+        "assets/a/c/v1/720/seg0.ts",
+        "assets/a/c/v1/captions_en.vtt",
+        "assets/a/c/v2/720/seg0.ts",
+        "assets/a/c/v2/720/seg1.ts",
+        "assets/a/notes.txt",
+        "readme.txt",
+    ]:
+        backend.upload(str(src), name)
+    storage_args = argparse.Namespace(storage="local", storage_root=str(tmp_path))
+
+    summary = inspect_bucket("bucket", workers=4, storage_args=storage_args)
+    records = [json.loads(line) for line in capsys.readouterr().out.splitlines()]
+
+    assets = {r["asset"]: r for r in records if r["type"] == "asset"}
+    assert assets["assets/a/c/v1"]["missing"] == []
+    assert assets["assets/a/c/v2"]["missing"] == ["master.m3u8", "720/index.m3u8", "captions"]
+    assert records[-1] == summary
+    assert summary["objects"] == 8
+    assert summary["bytes"] == 80
+    assert summary["assets"] == 2
+    assert summary["incomplete_assets"] == 1
+    assert summary["segments"] == 3
+    assert summary["unassigned_objects"] == 2
+    assert summary["errors"] == []
@@ -0,0 +1,133 @@
+"""
+Tests for the caption job control and input handling in transcribe_to_vtt.py (no model needed).
+
+    cd Backend/scripts && python3 -m pytest -q
+"""
+
+import argparse
+import json
+import os
+import signal
+import subprocess
+import sys
+import textwrap
+from collections import namedtuple
+
+import pytest
+
+from caption_storage import LocalStorage
+from transcribe_to_vtt import EXIT_CANCELLED, JobCancelled, JobControl, open_media_input
+
+SCRIPTS_DIR = os.path.dirname(os.path.abspath(__file__))
+
+Segment = namedtuple("Segment", ["start", "end", "text"])
+
+
+def run_job_script(source, **kwargs):
+    return subprocess.Popen(
+        [sys.executable, "-c", textwrap.dedent(source)],
+        cwd=SCRIPTS_DIR, stdout=subprocess.PIPE, stderr=subprocess.STDOUT, text=True, **kwargs
+    )
+
+
+def test_check_raises_after_cancel():
+    control = JobControl()
+    control.check()
+    control.cancel("test")
+    with pytest.raises(JobCancelled, match="test"):
+        control.check()
+
+
+def test_watchdog_cancels_after_deadline():
+    control = JobControl(deadline=0.05)
+    control.start_watchdog(interval=0.01)
+    try:
+        assert control.cancel_event.wait(5)
+        assert "deadline" in control.reason
+    finally:
+        control.finished_event.set()
+
+
+def test_write_checkpoint_replaces_file_with_partial_segments(tmp_path):
+    path = tmp_path / "checkpoint.json"
+    path.write_text("stale")
+    control = JobControl(checkpoint_path=str(path))
+    control.checkpoint_info = {"asset_id": "v1"}
+    control.segments = [Segment(0.0, 1.5, "hello"), Segment(1.5, 3.0, "world")]
+    control.cancel("test")
+    control.write_checkpoint()
+
+    checkpoint = json.loads(path.read_text())
+    assert checkpoint["asset_id"] == "v1"
+    assert checkpoint["reason"] == "test"
+    assert checkpoint["segments_done"] == 2
+    assert checkpoint["last_end"] == 3.0
+    assert [s["text"] for s in checkpoint["segments"]] == ["hello", "world"]
+    # Written to a temp file and renamed into place
+    assert os.listdir(tmp_path) == ["checkpoint.json"]
+
+    control.discard_checkpoint()
+    assert not path.exists()
+
+
+def test_abort_exits_with_cancelled_status(tmp_path):
+    checkpoint = tmp_path / "checkpoint.json"
+    temp_dir = tmp_path / "work"
+    temp_dir.mkdir()
+    proc = run_job_script(f"""
+        from transcribe_to_vtt import JobControl
+        control = JobControl(checkpoint_path={str(checkpoint)!r})
+        control.temp_paths.append({str(temp_dir)!r})
+        control.cancel("test")
+        control.abort()
+        print("not reached")
+    """)
+    output, _ = proc.communicate(timeout=30)
+    assert proc.returncode == EXIT_CANCELLED, output
+    assert "not reached" not in output
+    assert json.loads(checkpoint.read_text())["reason"] == "test"
+    assert not temp_dir.exists()
+
+
+@pytest.mark.skipif(not hasattr(signal, "sigwait"), reason="POSIX signals only")
+def test_sigterm_goes_through_cancel_path(tmp_path):
+    checkpoint = tmp_path / "checkpoint.json"
+    proc = run_job_script(f"""
+        import time
+        from transcribe_to_vtt import JobCancelled, JobControl
+        control = JobControl(checkpoint_path={str(checkpoint)!r})
+        control.install_signal_handlers()
+        print("ready", flush=True)
+        try:
+            while True:
+                control.check()
+                time.sleep(0.01)
+        except JobCancelled:
+            control.abort()
+    """)
+    assert proc.stdout.readline().strip() == "ready"
+    proc.send_signal(signal.SIGTERM)
+    output, _ = proc.communicate(timeout=30)
+    assert proc.returncode == EXIT_CANCELLED, output
+    assert json.loads(checkpoint.read_text())["reason"] == "received SIGTERM"
+
+
+def test_open_media_input_reads_local_storage_through_backend(tmp_path):
+    src = tmp_path / "src.mp4"
+    src.write_bytes(b"media")
+    backend = LocalStorage(str(tmp_path), "bucket")
+    url = backend.upload(str(src), "assets/a/c/v1/source.mp4")
+    args = argparse.Namespace(storage="local", storage_root=str(tmp_path), bucket="bucket")
+
+    reader = open_media_input(args, url)
+    assert reader is not None
+    with reader:
+        assert reader.read() == b"media"
+    assert open_media_input(args, backend.public_url("assets/a/c/v1/master.m3u8")) is None
+    assert open_media_input(args, "https://example.com/video.mp4") is None
+
+
+def test_open_media_input_keeps_gcs_urls_for_direct_decoding():
+    # No client is created: GCS media is decoded straight from its public URL
+    args = argparse.Namespace(storage="gcs", bucket="bucket")
+    assert open_media_input(args, "https://storage.googleapis.com/bucket/assets/a/c/v1/source.mp4") is None
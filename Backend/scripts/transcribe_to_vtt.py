@@ -1,12 +1,30 @@
 #!/usr/bin/env python3
 import argparse
+import json
 import os
+import shutil
+import signal
 import sys
 import tempfile
+import threading
 import time
 from datetime import datetime
-from faster_whisper import WhisperModel
-from google.cloud import storage
+from caption_languages import DEFAULT_ALLOWED_LANGUAGES, transcribe_code_mixed
+from caption_formats import WordTimings, add_cue_arguments, build_cues, cue_options, write_captions
+from caption_storage import GCSStorage, add_storage_arguments, open_storage
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+# Extra caption formats that can be rendered from stored word timings
+CAPTION_CONTENT_TYPES = {"vtt": "text/vtt", "srt": "application/x-subrip", "json": "application/json"}
+
+# Exit status used when a job is cancelled, hits its deadline or exceeds a resource limit
+EXIT_CANCELLED = 3
+# ISO 639-2 code for a code-mixed (--lang auto) caption track
+MIXED_LANGUAGE = "mul"
 
 def log_with_timestamp(message, level="INFO"):
     """Log message with timestamp and level"""
@@ -30,6 +48,183 @@ def log_progress(current, total, task_name, start_time=None):
     print(f"[{timestamp}] [PROGRESS] {task_name}: [{progress_bar}] {percentage:.1f}% ({current}/{total}){eta_str}")
     sys.stdout.flush()  # Force immediate output
 
+class JobCancelled(Exception):
+    """Raised between segments once the job has been asked to stop"""
+
+class JobControl:
+    """Cooperative cancellation, deadline and RSS/CPU-time watchdog for one caption job.
+
+    Cancellation is requested by SIGTERM/SIGINT, a "cancel" line on stdin
+    (--control-stdin), the deadline or a resource limit. The transcription
+    loop calls check() between segments; if it does not get there within
+    grace_seconds (e.g. stuck decoding a remote stream), the watchdog writes
+    the checkpoint, removes temp files and exits the process itself.
+    """
+
+    def __init__(self, deadline=None, max_rss_mb=None, max_cpu_seconds=None,
+                 grace_seconds=30.0, checkpoint_path=None):
+        self.started = time.time()
+        self.deadline = deadline
+        self.max_rss_mb = max_rss_mb
+        self.max_cpu_seconds = max_cpu_seconds
+        self.grace_seconds = grace_seconds
+        self.checkpoint_path = checkpoint_path
+        self.cancel_event = threading.Event()
+        self.finished_event = threading.Event()
+        self.reason = None
+        self.cancelled_at = None
+        self.segments = []
+        self.checkpoint_info = {}
+        self.temp_paths = []
+        self._lock = threading.Lock()
+        self._exiting = False
+
+    def cancel(self, reason):
+        with self._lock:
+            if self.cancel_event.is_set():
+                return
+            self.reason = reason
+            self.cancelled_at = time.time()
+            self.cancel_event.set()
+        log_with_timestamp(f"🛑 Cancellation requested: {reason}", level="WARNING")
+
+    def check(self):
+        if self.cancel_event.is_set():
+            raise JobCancelled(self.reason)
+
+    def install_signal_handlers(self):
+        """Route SIGTERM/SIGINT to cancel().
+
+        On POSIX the signals are blocked and consumed by a dedicated thread,
+        so they are noticed even while the main thread is inside native code.
+        Ctrl+C therefore goes through the cancel path (checkpoint, exit status
+        EXIT_CANCELLED) instead of raising KeyboardInterrupt.
+        """
+        signals = [signal.SIGTERM, signal.SIGINT]
+        if hasattr(signal, "pthread_sigmask") and hasattr(signal, "sigwait"):
+            # The blocked mask is inherited by child processes, which would then
+            # ignore SIGTERM/SIGINT. If this job ever starts subprocesses, unblock
+            # them in the child, e.g.
+            #   preexec_fn=lambda: signal.pthread_sigmask(signal.SIG_UNBLOCK, signals)
+            signal.pthread_sigmask(signal.SIG_BLOCK, signals)
+
+            def wait_for_signal():
+                while True:
+                    signum = signal.sigwait(signals)
+                    self.cancel(f"received {signal.Signals(signum).name}")
+
+            threading.Thread(target=wait_for_signal, daemon=True).start()
+        else:
+            for signum in signals:
+                signal.signal(signum, lambda signum, frame: self.cancel(f"received signal {signum}"))
+
+    def start_control_listener(self, stream=None):
+        """Worker mode: accept "cancel" control messages, one per line"""
+        stream = stream or sys.stdin
+
+        def listen():
+            for line in stream:
+                if line.strip().lower() == "cancel":
+                    self.cancel("cancel message received")
+                    return
+
+        threading.Thread(target=listen, daemon=True).start()
+
+    def current_rss_mb(self):
+        try:
+            with open("/proc/self/statm") as f:
+                resident_pages = int(f.read().split()[1])
+            return resident_pages * os.sysconf("SC_PAGE_SIZE") / (1024 * 1024)
+        except (OSError, ValueError, IndexError, AttributeError):
+            pass
+        if resource is None:
+            return None
+        # Peak RSS; reported in bytes on macOS and kilobytes on Linux
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+    def start_watchdog(self, interval=1.0):
+        def watch():
+            while not self.finished_event.wait(interval):
+                if not self.cancel_event.is_set():
+                    elapsed = time.time() - self.started
+                    if self.deadline and elapsed > self.deadline:
+                        self.cancel(f"deadline of {self.deadline:g}s exceeded")
+                    elif self.max_cpu_seconds and time.process_time() > self.max_cpu_seconds:
+                        self.cancel(f"CPU time limit of {self.max_cpu_seconds:g}s exceeded")
+                    elif self.max_rss_mb:
+                        rss_mb = self.current_rss_mb()
+                        if rss_mb is not None and rss_mb > self.max_rss_mb:
+                            self.cancel(f"RSS {rss_mb:.0f}MB exceeds limit of {self.max_rss_mb:.0f}MB")
+                elif time.time() - self.cancelled_at > self.grace_seconds:
+                    log_with_timestamp(
+                        f"Job did not stop within {self.grace_seconds:g}s grace period, forcing exit",
+                        level="ERROR"
+                    )
+                    self.abort()
+
+        threading.Thread(target=watch, daemon=True).start()
+
+    def write_checkpoint(self):
+        if not self.checkpoint_path:
+            return
+        segments = list(self.segments)
+        checkpoint = dict(self.checkpoint_info)
+        checkpoint.update({
+            "reason": self.reason,
+            "elapsed_seconds": round(time.time() - self.started, 3),
+            "segments_done": len(segments),
+            "last_end": float(getattr(segments[-1], "end", 0.0)) if segments else 0.0,
+            "segments": [
+                {"start": float(getattr(seg, "start", 0.0)),
+                 "end": float(getattr(seg, "end", 0.0)),
+                 "text": getattr(seg, "text", "")}
+                for seg in segments
+            ],
+        })
+        try:
+            tmp_path = f"{self.checkpoint_path}.tmp"
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump(checkpoint, f, ensure_ascii=False)
+            os.replace(tmp_path, self.checkpoint_path)
+            log_with_timestamp(
+                f"Checkpoint written: {self.checkpoint_path} ({len(segments)} segments)", level="INFO"
+            )
+        except Exception as e:
+            log_with_timestamp(f"Failed to write checkpoint: {e}", level="WARNING")
+
+    def discard_checkpoint(self):
+        """Remove a checkpoint left by an earlier cancelled run once the job has succeeded"""
+        if self.checkpoint_path and os.path.exists(self.checkpoint_path):
+            try:
+                os.unlink(self.checkpoint_path)
+                log_with_timestamp(f"Removed stale checkpoint: {self.checkpoint_path}", level="INFO")
+            except OSError as e:
+                log_with_timestamp(f"Failed to remove checkpoint {self.checkpoint_path}: {e}", level="WARNING")
+
+    def cleanup(self):
+        for path in self.temp_paths:
+            try:
+                if os.path.isdir(path):
+                    shutil.rmtree(path, ignore_errors=True)
+                elif os.path.exists(path):
+                    os.unlink(path)
+            except Exception as e:
+                log_with_timestamp(f"Failed to clean up temp path {path}: {e}", level="WARNING")
+
+    def abort(self):
+        """Checkpoint, clean up and leave with EXIT_CANCELLED"""
+        with self._lock:
+            if self._exiting:
+                return
+            self._exiting = True
+        self.finished_event.set()
+        self.write_checkpoint()
+        self.cleanup()
+        log_with_timestamp(f"❌ Caption job cancelled: {self.reason}", level="ERROR")
+        sys.stdout.flush()
+        os._exit(EXIT_CANCELLED)
+
 def format_ts(t: float) -> str:
     try:
         t = float(t)
@@ -52,30 +247,59 @@ def write_vtt(segments, out_path: str):
             start_ts = format_ts(start_ms / 1000.0)
             end_ts = format_ts(end_ms / 1000.0)
             text = getattr(seg, "text", "").strip()
+            language = getattr(seg, "language", None)
+            if text and language:
+                # Code-mixed transcripts tag each cue with its spoken language
+                text = f"<lang {language}>{text}</lang>"
             if text:
                 f.write(f"{start_ts} --> {end_ts}\n{text}\n\n")
 
-def upload_to_gcs(bucket_name: str, local_path: str, dest_path: str) -> str:
-    """Upload file to GCS with proper service account credentials"""
+def upload_captions(storage_backend, local_path: str, dest_path: str, metadata=None) -> str:
+    """Upload a caption file through the configured storage backend and make it public"""
     try:
-        # Use explicit credentials path for SIH project
-        credentials_path = "/Users/smitthakkar/Downloads/SIH/Backend/gcp-credentials.json"
-        if os.path.exists(credentials_path):
-            os.environ['GOOGLE_APPLICATION_CREDENTIALS'] = credentials_path
-            log_with_timestamp(f"Using SIH service account credentials: {credentials_path}", level="INFO")
-        
-        client = storage.Client()
-        bucket = client.bucket(bucket_name)
-        blob = bucket.blob(dest_path)
-        blob.upload_from_filename(local_path, content_type="text/vtt")
-        blob.make_public()
-        public_url = blob.public_url
-        log_with_timestamp(f"✅ Uploaded to GCS: {public_url}", level="SUCCESS")
+        public_url = storage_backend.upload(
+            local_path, dest_path, content_type="text/vtt", metadata=metadata, public=True
+        )
+        log_with_timestamp(f"✅ Uploaded to {storage_backend.bucket_name}: {public_url}", level="SUCCESS")
         return public_url
     except Exception as e:
-        log_with_timestamp(f"❌ GCS upload failed: {str(e)}", level="ERROR")
+        log_with_timestamp(f"❌ Caption upload failed: {str(e)}", level="ERROR")
         raise
 
+def open_input_storage(args, input_url: str):
+    """Return (storage_backend, object_name) for an input URL/path stored in a bucket"""
+    output_storage = open_storage(args, args.bucket)
+    object_name = output_storage.object_name_from_url(input_url)
+    if object_name is not None:
+        return output_storage, object_name
+    # URL format: https://bucket-name.storage.googleapis.com/path/to/asset/master.m3u8
+    bucket_name, object_name = GCSStorage.split_url(input_url)
+    if args.storage == "gcs" and bucket_name:
+        return open_storage(args, bucket_name), object_name
+    raise ValueError(f"Input is not served by the '{args.storage}' storage backend: {input_url}")
+
+def open_media_input(args, input_source: str):
+    """Open a local-storage media object as a seekable file read through the backend.
+
+    This keeps the --simulate-* latency/bandwidth limits on the media transfer.
+    Returns None (decode input_source directly) for HLS playlists, inputs the
+    backend does not serve and GCS, where the decoder streams the public URL
+    over one connection instead of one authenticated request per block.
+    """
+    if args.storage != "local" or ".m3u8" in input_source:
+        return None
+    try:
+        source_storage, object_name = open_input_storage(args, input_source)
+    except ValueError:
+        return None
+    try:
+        reader = source_storage.open_reader(object_name)
+        log_with_timestamp(f"Reading input through {args.storage} storage: {object_name}", level="INFO")
+        return reader
+    except Exception as e:
+        log_with_timestamp(f"Cannot read input through storage ({e}), opening it directly", level="WARNING")
+        return None
+
 def translate_to_hindi(text: str) -> str:
     # Fast word replacement for common terms
     key_translations = {
@@ -152,17 +376,58 @@ def translate_to_punjabi(text: str) -> str:
     return result
 
 def main():
-    p = argparse.ArgumentParser(description="Transcribe audio/video to multi-language WebVTT and upload to GCS")
+    p = argparse.ArgumentParser(description="Transcribe audio/video to multi-language WebVTT and upload to storage")
     p.add_argument("--input", required=True, help="Input path or URL (mp4, mp3, wav, or HLS master.m3u8)")
-    p.add_argument("--bucket", required=True, help="GCS bucket name (public bucket for playback)")
+    p.add_argument("--bucket", required=True, help="Bucket name (public bucket for playback)")
     p.add_argument("--admin-id", required=True)
     p.add_argument("--course-id", required=True)
     p.add_argument("--asset-id", required=True)
-    p.add_argument("--lang", default="en", help="Primary transcription language (forced to English)")
+    p.add_argument("--lang", default="en",
+                   help="Transcription language code, or 'auto' to detect language per speech chunk (code-mixed lectures)")
+    p.add_argument("--allowed-langs", default=",".join(DEFAULT_ALLOWED_LANGUAGES),
+                   help="With --lang auto: comma-separated languages a chunk may be detected as")
+    p.add_argument("--lang-chunk-seconds", type=float, default=30.0,
+                   help="With --lang auto: maximum speech chunk length for language detection")
     p.add_argument("--model", default="base", help="faster-whisper model size: tiny/base/small/medium/large-v3")
     p.add_argument("--compute-type", default="int8", help="CPU: int8 or int8_float16; fallback: float32")
     p.add_argument("--generate-all-langs", action="store_true", help="Generate captions for English, Hindi, and Punjabi")
+    p.add_argument("--deadline", type=float, default=None, help="Cancel the job after this many seconds")
+    p.add_argument("--max-rss-mb", type=float, default=None, help="Cancel the job if resident memory exceeds this many MB")
+    p.add_argument("--max-cpu-seconds", type=float, default=None, help="Cancel the job after this much CPU time")
+    p.add_argument("--cancel-grace", type=float, default=30.0,
+                   help="Seconds to wait for a clean stop between segments before forcing exit")
+    p.add_argument("--checkpoint", default=None,
+                   help="Checkpoint JSON written on cancellation and removed on success "
+                        "(default: caption_checkpoint_<asset-id>.json in the temp dir)")
+    p.add_argument("--control-stdin", action="store_true", help="Worker mode: read 'cancel' control messages from stdin")
+    p.add_argument("--word-timestamps", action="store_true",
+                   help="Keep word timings (words_<lang>.json) and re-segment captions into readable cues")
+    p.add_argument("--caption-formats", default="vtt",
+                   help="Comma-separated formats to upload with --word-timestamps: vtt,srt,json")
+    add_cue_arguments(p)
+    add_storage_arguments(p)
     args = p.parse_args()
+    caption_formats = [f.strip() for f in args.caption_formats.split(",") if f.strip()]
+    unknown_formats = [f for f in caption_formats if f not in CAPTION_CONTENT_TYPES]
+    if unknown_formats:
+        p.error(f"Unknown caption format(s): {', '.join(unknown_formats)}")
+    if caption_formats != ["vtt"] and not args.word_timestamps:
+        p.error("--caption-formats other than vtt needs --word-timestamps")
+
+    control = JobControl(
+        deadline=args.deadline,
+        max_rss_mb=args.max_rss_mb,
+        max_cpu_seconds=args.max_cpu_seconds,
+        grace_seconds=args.cancel_grace,
+        checkpoint_path=args.checkpoint or os.path.join(
+            tempfile.gettempdir(), f"caption_checkpoint_{args.asset_id}.json"
+        ),
+    )
+    control.checkpoint_info = {"asset_id": args.asset_id, "course_id": args.course_id, "input": args.input}
+    control.install_signal_handlers()
+    if args.control_stdin:
+        control.start_control_listener()
+    control.start_watchdog()
 
     log_with_timestamp("Starting transcription process...", level="INFO")
     
@@ -170,6 +435,7 @@ def main():
     total_phases = 4
     current_phase = 0
     temp_video_file = None
+    media_reader = None
     
     def update_overall_progress(phase_name, phase_num):
         nonlocal current_phase
@@ -182,6 +448,8 @@ def main():
         # Phase 1: Model Loading
         update_overall_progress("Loading Whisper Model", 1)
         log_with_timestamp(f"Loading model '{args.model}' with compute_type '{args.compute_type}'...", level="INFO")
+        # Imported here so the job helpers above can be used (and tested) without faster-whisper
+        from faster_whisper import WhisperModel
         model = WhisperModel(
             args.model, 
             device="cpu", 
@@ -189,31 +457,20 @@ def main():
             download_root=os.path.expanduser("~/.cache/huggingface/hub")
         )
         log_with_timestamp("✅ Model loaded successfully", level="SUCCESS")
+        control.check()
 
-        # Handle HLS URLs by finding the original source video file using GCS API
+        # Handle HLS URLs by finding the original source video file in storage
         input_source = args.input
         
         if args.input.endswith('master.m3u8') or 'master.m3u8' in args.input:
-            log_with_timestamp("HLS URL detected, searching for source video file using GCS API...", level="INFO")
-            
-            # Extract bucket and path from URL
-            # URL format: https://bucket-name.storage.googleapis.com/path/to/asset/master.m3u8
-            url_parts = args.input.replace('https://', '').split('/')
-            bucket_name = url_parts[0].split('.')[0]  # Extract bucket name
-            asset_path = '/'.join(url_parts[1:-1])  # Remove master.m3u8 from path
+            log_with_timestamp(f"HLS URL detected, searching for source video file in {args.storage} storage...", level="INFO")
             
             try:
-                from google.cloud import storage
-                from google.oauth2 import service_account
-                
-                # Load credentials
-                credentials_path = "/Users/smitthakkar/Downloads/SIH/Backend/gcp-credentials.json"
-                credentials = service_account.Credentials.from_service_account_file(credentials_path)
-                client = storage.Client(credentials=credentials, project="dev-airlock-471717-b0")
-                bucket = client.bucket(bucket_name)
+                source_storage, master_name = open_input_storage(args, args.input)
+                asset_path = master_name.rsplit('/', 1)[0]  # Remove master.m3u8 from path
                 
                 # List all files in the asset directory
-                blobs = list(bucket.list_blobs(prefix=asset_path))
+                blobs = list(source_storage.list_objects(prefix=asset_path))
                 
                 # Look for video files in order of preference
                 video_extensions = ['.mp4', '.mov', '.avi', '.mkv', '.webm']
@@ -227,7 +484,7 @@ def main():
                         target_name = f"{asset_path}/{name}{ext}"
                         for blob in blobs:
                             if blob.name == target_name:
-                                found_video = f"https://{bucket_name}.storage.googleapis.com/{blob.name}"
+                                found_video = source_storage.public_url(blob.name)
                                 log_with_timestamp(f"Found preferred source video: {blob.name}", level="SUCCESS")
                                 break
                         if found_video:
@@ -242,53 +499,81 @@ def main():
                             # Skip HLS segments and small files
                             if not any(segment in blob.name for segment in ['/480/', '/720/', '/1080/', 'segment', '.ts']):
                                 if blob.size and blob.size > 1024 * 1024:  # At least 1MB
-                                    found_video = f"https://{bucket_name}.storage.googleapis.com/{blob.name}"
+                                    found_video = source_storage.public_url(blob.name)
                                     log_with_timestamp(f"Found video file: {blob.name} ({blob.size / (1024*1024):.1f}MB)", level="SUCCESS")
                                     break
                 
                 if found_video:
                     input_source = found_video
                 else:
-                    log_with_timestamp("No suitable video file found in GCS bucket", level="WARNING")
+                    log_with_timestamp("No suitable video file found in bucket", level="WARNING")
                     # Try to use the highest quality HLS stream instead
                     hls_variants = ['1080', '720', '480']
                     for variant in hls_variants:
-                        variant_url = args.input.replace('master.m3u8', f'{variant}/index.m3u8')
+                        variant_name = f"{asset_path}/{variant}/index.m3u8"
                         try:
-                            import requests
-                            response = requests.head(variant_url, timeout=5)
-                            if response.status_code == 200:
-                                input_source = variant_url
+                            if source_storage.stat(variant_name):
+                                input_source = source_storage.public_url(variant_name)
                                 log_with_timestamp(f"Using HLS variant: {variant}p", level="INFO")
                                 break
-                        except:
+                        except Exception:
                             continue
                     
                     if input_source == args.input:
                         log_with_timestamp("No working HLS variants found, will try original URL", level="WARNING")
                         
             except Exception as e:
-                log_with_timestamp(f"Error accessing GCS bucket: {e}", level="ERROR")
+                log_with_timestamp(f"Error accessing storage bucket: {e}", level="ERROR")
                 log_with_timestamp("Falling back to original HLS URL", level="WARNING")
 
         # Phase 2: Transcription
+        control.check()
         update_overall_progress("Transcribing Audio", 2)
         log_with_timestamp(f"Transcribing '{input_source}' in language '{args.lang}'...", level="INFO")
-        args.lang = "en"  # Force English transcription regardless of input
+        media_reader = open_media_input(args, input_source)
+        if media_reader is not None:
+            input_source = media_reader
         # Create a custom progress callback for transcription
         transcription_start_time = time.time()
         segments_processed = 0
         last_progress_time = time.time()
+        detection_seconds = None
         
-        segments_iter, info = model.transcribe(
-            input_source,
-            language=args.lang,
-            vad_filter=True,  # helps with noisy audio
-            beam_size=1,  # Faster processing
-            best_of=1,  # Faster processing
-            temperature=0.0,  # Deterministic
-            condition_on_previous_text=False  # Faster
-        )
+        if args.lang == "auto":
+            # Code-mixed lectures: detect language per VAD chunk, then transcribe each language group
+            allowed_langs = [lang.strip() for lang in args.allowed_langs.split(",") if lang.strip()]
+            segments_iter, info = transcribe_code_mixed(
+                model,
+                input_source,
+                allowed_languages=allowed_langs,
+                max_chunk_seconds=args.lang_chunk_seconds,
+                word_timestamps=args.word_timestamps,
+                should_stop=control.check,  # Honour cancellation during decode/detection
+                beam_size=1,  # Faster processing
+                best_of=1,  # Faster processing
+                temperature=0.0,  # Deterministic
+                condition_on_previous_text=False  # Faster
+            )
+            detection_seconds = info.detection_seconds
+            languages_summary = ", ".join(
+                f"{lang}: {seconds:.0f}s" for lang, seconds in sorted(info.language_seconds.items(), key=lambda x: -x[1])
+            )
+            log_with_timestamp(
+                f"Detected languages in {len(info.chunks)} speech chunks ({languages_summary}) "
+                f"in {detection_seconds:.2f}s",
+                level="INFO"
+            )
+        else:
+            segments_iter, info = model.transcribe(
+                input_source,
+                language=args.lang,
+                vad_filter=True,  # helps with noisy audio
+                beam_size=1,  # Faster processing
+                best_of=1,  # Faster processing
+                temperature=0.0,  # Deterministic
+                condition_on_previous_text=False,  # Faster
+                word_timestamps=args.word_timestamps
+            )
         
         # Get audio duration info if available
         audio_duration = getattr(info, 'duration', None)
@@ -297,18 +582,19 @@ def main():
         
         # Process segments with real-time progress tracking
         segments = []
+        control.segments = segments  # Shared so a cancellation can checkpoint partial progress
         log_with_timestamp("Processing transcription segments...", level="INFO")
         
         # Start a background thread to show periodic progress
-        import threading
         progress_stop_event = threading.Event()
+        # Furthest end time seen so far; --lang auto yields segments group by group, not in time order
+        progress_state = {"max_end": 0.0}
         
         def periodic_progress_update():
             while not progress_stop_event.is_set():
                 time.sleep(10)  # Update every 10 seconds
                 if not progress_stop_event.is_set() and segments:
-                    latest_segment = segments[-1]
-                    current_time = latest_segment.end
+                    current_time = progress_state["max_end"]
                     elapsed = time.time() - transcription_start_time
                     
                     if audio_duration and audio_duration > 0:
@@ -336,23 +622,26 @@ def main():
             for segment in segments_iter:
                 segments.append(segment)
                 segments_processed += 1
+                progress_state["max_end"] = max(progress_state["max_end"], segment.end)
+                control.check()
                 
                 # Show progress every 50 segments or every 30 seconds
                 current_time = time.time()
                 if segments_processed % 50 == 0 or (current_time - last_progress_time) > 30:
+                    max_end = progress_state["max_end"]
                     if audio_duration and audio_duration > 0:
-                        progress_percentage = (segment.end / audio_duration) * 100
+                        progress_percentage = (max_end / audio_duration) * 100
                         elapsed = current_time - transcription_start_time
-                        processing_rate = segment.end / elapsed if elapsed > 0 else 0
+                        processing_rate = max_end / elapsed if elapsed > 0 else 0
                         
                         log_with_timestamp(
-                            f"🎵 Processing segment {segments_processed}: {segment.end:.1f}s ({progress_percentage:.1f}%) "
+                            f"🎵 Processing segment {segments_processed}: {max_end:.1f}s ({progress_percentage:.1f}%) "
                             f"| Rate: {processing_rate:.1f}x",
                             level="PROGRESS"
                         )
                     else:
                         log_with_timestamp(
-                            f"🎵 Processing segment {segments_processed}: {segment.end:.1f}s",
+                            f"🎵 Processing segment {segments_processed}: {max_end:.1f}s",
                             level="PROGRESS"
                         )
                     last_progress_time = current_time
@@ -362,6 +651,9 @@ def main():
             
             log_with_timestamp(f"✅ Transcription complete. Found {len(segments)} segments.", level="SUCCESS")
             
+        except JobCancelled:
+            progress_stop_event.set()
+            raise
         except Exception as transcription_error:
             # Stop progress thread
             progress_stop_event.set()
@@ -370,30 +662,45 @@ def main():
             log_with_timestamp("Attempting fallback transcription with reduced settings...", level="INFO")
             
             update_overall_progress("Transcribing with Fallback", 2)
+            if media_reader is not None:
+                media_reader.seek(0)
             segments_iter, info = model.transcribe(
                 input_source,
-                language=args.lang,
+                language=None if args.lang == "auto" else args.lang,  # Whisper's own detection as fallback
                 vad_filter=True,
                 beam_size=1,  # Smaller beam for faster processing
                 best_of=1,  # Faster processing
                 temperature=0.0,  # Deterministic
-                condition_on_previous_text=False  # Faster
+                condition_on_previous_text=False,  # Faster
+                word_timestamps=args.word_timestamps
             )
-            segments = list(segments_iter)
+            segments = []
+            control.segments = segments
+            for segment in segments_iter:
+                segments.append(segment)
+                control.check()
             log_with_timestamp(f"Fallback transcription complete. Found {len(segments)} segments.", level="SUCCESS")
 
         if not segments:
             log_with_timestamp("❌ No segments found in transcription", level="ERROR")
             sys.exit(1)
 
+        # Language groups are transcribed one after another; restore time order
+        segments.sort(key=lambda seg: seg.start)
+
         # Phase 3: Generate multi-language captions
         update_overall_progress("Generating Multi-language Captions", 3)
         
         languages_to_generate = ["en"]  # Force English only
 # Removed multi-language generation - English only
         
+        control.check()
         with tempfile.TemporaryDirectory() as td:
+            control.temp_paths.append(td)
             caption_files = {}
+            track_languages = {}
+            source_language = MIXED_LANGUAGE if args.lang == "auto" else args.lang
+            extra_files = []  # (local_path, file_name, content_type, track_language)
             
             for lang_code in languages_to_generate:
                 log_with_timestamp(f"Generating {lang_code} captions...", level="INFO")
@@ -428,32 +735,79 @@ def main():
                 
                 # Write VTT file
                 vtt_local = os.path.join(td, f"captions_{lang_code}.vtt")
-                write_vtt(lang_segments, vtt_local)
+                # captions_en.* is the player's track name; the original transcript is in the
+                # transcription language (code-mixed with --lang auto), translations in lang_code
+                track_language = source_language if lang_code == "en" else lang_code
+                track_languages[lang_code] = track_language
+                if args.word_timestamps:
+                    # Re-segment from word timings so cues stay short and readable
+                    timings = WordTimings.from_segments(lang_segments, language=track_language)
+                    cues = build_cues(timings, **cue_options(args))
+                    write_captions(cues, vtt_local, "vtt", language=track_language)
+                    words_local = os.path.join(td, f"words_{lang_code}.json")
+                    timings.save(words_local)
+                    extra_files.append((words_local, f"words_{lang_code}.json", "application/json", track_language))
+                    for fmt in caption_formats:
+                        if fmt == "vtt":
+                            continue
+                        file_name = f"captions_{lang_code}.{fmt}"
+                        write_captions(cues, os.path.join(td, file_name), fmt, language=track_language)
+                        extra_files.append((os.path.join(td, file_name), file_name, CAPTION_CONTENT_TYPES[fmt], track_language))
+                    log_with_timestamp(f"Built {len(cues)} cues from {len(timings)} words", level="INFO")
+                else:
+                    write_vtt(lang_segments, vtt_local)
                 caption_files[lang_code] = vtt_local
                 
                 log_with_timestamp(f"✅ {lang_code} captions generated: {len(lang_segments)} segments", level="SUCCESS")
 
-            # Phase 4: Upload to GCS
+            # Phase 4: Upload to storage
             update_overall_progress("Uploading Captions", 4)
             
+            control.check()
+            output_storage = open_storage(args, args.bucket)
             uploaded_urls = []
             for lang_code, vtt_local in caption_files.items():
                 dest_path = f"assets/{args.admin_id}/{args.course_id}/{args.asset_id}/captions_{lang_code}.vtt"
-                public_url = upload_to_gcs(args.bucket, vtt_local, dest_path)
+                public_url = upload_captions(
+                    output_storage, vtt_local, dest_path,
+                    metadata={"assetId": args.asset_id, "language": track_languages[lang_code], "model": args.model}
+                )
                 uploaded_urls.append(public_url)
                 log_with_timestamp(f"✅ {lang_code} captions uploaded: {public_url}", level="SUCCESS")
+            
+            for local_path, file_name, content_type, track_language in extra_files:
+                dest_path = f"assets/{args.admin_id}/{args.course_id}/{args.asset_id}/{file_name}"
+                output_storage.upload(
+                    local_path, dest_path, content_type=content_type,
+                    metadata={"assetId": args.asset_id, "language": track_language, "model": args.model}, public=True
+                )
+                log_with_timestamp(f"✅ Uploaded {file_name}", level="SUCCESS")
 
         primary_url = uploaded_urls[0] if uploaded_urls else ""
+        if detection_seconds is not None:
+            job_seconds = time.time() - control.started
+            log_with_timestamp(
+                f"Language detection overhead: {detection_seconds:.2f}s "
+                f"({detection_seconds / job_seconds * 100:.1f}% of {job_seconds:.1f}s job time)",
+                level="INFO"
+            )
         log_with_timestamp(f"Caption generation process completed. Primary URL: {primary_url}", level="SUCCESS")
         print(primary_url)
 
+        control.discard_checkpoint()
         log_with_timestamp("🎉 Caption generation completed successfully!", level="SUCCESS")
         
+    except JobCancelled:
+        control.abort()
+
     except Exception as e:
         log_with_timestamp(f"❌ Error during transcription: {str(e)}", level="ERROR")
         sys.exit(1)
     
     finally:
+        control.finished_event.set()
+        if media_reader is not None:
+            media_reader.close()
         # Clean up temporary video file if created
         if temp_video_file and os.path.exists(temp_video_file.name):
             try: